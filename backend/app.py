@@ -4,9 +4,11 @@ Punto de entrada principal con factory pattern
 """
 from flask import Flask
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 from config import Config
 from models import db
+from cache import response_cache
+from storage import storage
 
 
 def create_app():
@@ -20,6 +22,8 @@ def create_app():
     db.init_app(app)
     CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
     jwt = JWTManager(app)
+    response_cache.init_app(app)
+    storage.init_app(app)
     
     import sys
     from flask import jsonify
@@ -60,15 +64,29 @@ def create_app():
     from routes.recipes import recipes_bp
     from routes.auth import auth_bp
     from routes.user import user_bp
+    from routes.uploads import uploads_bp, upload_sessions_bp
     
     app.register_blueprint(recipes_bp, url_prefix='/api/recipes')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(user_bp, url_prefix='/api/users')
+    app.register_blueprint(upload_sessions_bp, url_prefix='/api/uploads')
+    # Tiene prioridad sobre la ruta /static genérica de Flask
+    app.register_blueprint(uploads_bp, url_prefix='/static/uploads')
     
     # Ruta de health check
     @app.route('/api/health')
     def health_check():
         return {'status': 'ok', 'message': 'ChefCommunity API running'}
+
+    # Contadores de la caché de respuestas (por worker, Solo Admin)
+    @app.route('/api/cache/stats')
+    @jwt_required()
+    def cache_stats():
+        from models import User
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.rol != 'admin':
+            return jsonify({'error': 'No autorizado'}), 403
+        return response_cache.stats()
     
     # Ruta raíz
     @app.route('/')
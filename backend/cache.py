@@ -0,0 +1,242 @@
+"""
+Caché de respuestas para lecturas anónimas de recetas
+Backends intercambiables: 'memory' (LRU con TTL dentro de cada worker) y
+'redis' (compartido por todos los workers de gunicorn). La invalidación va
+por generaciones: cada escritura incrementa la generación del listado y la de
+la receta afectada, y las claves antiguas dejan de leerse y caducan solas.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+
+class MemoryCache:
+    """LRU con TTL en el proceso; las generaciones no se desalojan"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=2048, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clave -> (caduca_en, valor)
+        self._counters = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.default_ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def counter(self, key, initial):
+        with self._lock:
+            return self._counters.setdefault(key, initial)
+
+    def incr(self, key, initial):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, initial) + 1
+            return self._counters[key]
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class RedisCache:
+    """Backend compartido entre workers (requiere el paquete redis)"""
+
+    name = 'redis'
+
+    def __init__(self, url, default_ttl=60, prefix='chef:'):
+        import redis  # dependencia opcional: sólo si CACHE_BACKEND=redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl or self.default_ttl)
+
+    def counter(self, key, initial):
+        self.client.set(self.prefix + key, initial, nx=True)
+        return int(self.client.get(self.prefix + key))
+
+    def incr(self, key, initial):
+        self.client.set(self.prefix + key, initial, nx=True)
+        return self.client.incr(self.prefix + key)
+
+    def stats(self):
+        info = self.client.info('stats')
+        return {
+            'evictions': info.get('evicted_keys'),
+            'expirations': info.get('expired_keys'),
+            'server_hits': info.get('keyspace_hits'),
+            'server_misses': info.get('keyspace_misses'),
+        }
+
+
+class ResponseCache:
+    """Fachada con contadores de aciertos/fallos por worker"""
+
+    def __init__(self):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+        if backend == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'], default_ttl=ttl)
+        elif backend == 'memory':
+            self.backend = MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 2048), default_ttl=ttl)
+        else:
+            self.backend = None
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def generation(self, name):
+        # Un contador perdido (reinicio, desalojo) renace con la hora actual
+        # para no volver a coincidir con generaciones antiguas
+        return self.backend.counter(f'gen:{name}', time.time_ns())
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            print(f"Cache get error: {e}")
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, value)
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Cache set error: {e}")
+
+    def invalidate(self, *names):
+        """Incrementa las generaciones indicadas ('recipes', 'recipe:12'...)"""
+        if not self.enabled:
+            return
+        for name in names:
+            try:
+                self.backend.incr(f'gen:{name}', time.time_ns())
+                self.invalidations += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Cache invalidate error: {e}")
+
+    def stats(self):
+        data = {
+            'backend': self.backend.name if self.backend else None,
+            'worker_pid': os.getpid(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'invalidations': self.invalidations,
+            'errors': self.errors,
+        }
+        if self.backend:
+            try:
+                data.update(self.backend.stats())
+            except Exception as e:
+                data['stats_error'] = str(e)
+        return data
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_recipes(*recipe_ids):
+    """Llamar tras confirmar una escritura: invalida los listados y el detalle de esas recetas"""
+    response_cache.invalidate('recipes', *(f'recipe:{recipe_id}' for recipe_id in recipe_ids))
+
+
+def query_key(args):
+    """Huella de los parámetros normalizados (ordenados, sin valores vacíos)"""
+    items = sorted((k, v.strip()) for k, values in args.lists() for v in values if v.strip())
+    raw = '&'.join(f'{k}={v}' for k, v in items)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def listing_cache_key():
+    return f"recipes:list:{response_cache.generation('recipes')}:{request.path}:{query_key(request.args)}"
+
+
+def detail_cache_key(recipe_id):
+    # La ruta distingue el detalle de sus subrecursos (p.ej. /reviews)
+    return f"recipes:detail:{recipe_id}:{response_cache.generation(f'recipe:{recipe_id}')}:{request.path}:{query_key(request.args)}"
+
+
+def cache_anonymous(key_func):
+    """
+    Sirve desde caché las respuestas JSON de peticiones sin Authorization.
+    La clave se calcula al empezar, así una escritura concurrente hace que
+    lo calculado con datos viejos quede bajo una generación ya obsoleta.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled or request.headers.get('Authorization'):
+                return view(*args, **kwargs)
+
+            # La clave lee la generación del backend: si no responde, sin caché
+            try:
+                key = key_func(*args, **kwargs)
+            except Exception as e:
+                response_cache.errors += 1
+                print(f"Cache key error: {e}")
+                return view(*args, **kwargs)
+            body = response_cache.get(key)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response_cache.set(key, response.get_data())
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
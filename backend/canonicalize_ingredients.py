@@ -0,0 +1,74 @@
+"""
+Normaliza el catálogo de ingredientes
+Calcula canonical_name de cada ingrediente, fusiona los duplicados ('Tomate',
+'tomates', 'tomate ') en el de id más bajo y crea el índice único.
+Uso: python canonicalize_ingredients.py  (después de fix_db.py)
+"""
+from app import app, db
+from sqlalchemy import text
+from ingredients import canonical_name, GENERIC_UNITS
+from models import Ingredient, IngredientAlias, RecipeIngredient, UserStock, RecipeChange
+
+
+def _merge_into(keep, duplicate):
+    """Reasigna recetas, despensas y alias del duplicado al ingrediente que se conserva"""
+    for ri in RecipeIngredient.query.filter_by(ingredient_id=duplicate.id).all():
+        existing = RecipeIngredient.query.get((ri.recipe_id, keep.id))
+        if existing:
+            existing.quantity = (existing.quantity or 0) + (ri.quantity or 0)
+            db.session.delete(ri)
+        else:
+            ri.ingredient_id = keep.id
+        RecipeChange.record(ri.recipe_id)
+
+    for stock in UserStock.query.filter_by(ingredient_id=duplicate.id).all():
+        existing = UserStock.query.get((stock.user_id, keep.id))
+        if existing:
+            existing.quantity = (existing.quantity or 0) + (stock.quantity or 0)
+            db.session.delete(stock)
+        else:
+            stock.ingredient_id = keep.id
+
+    IngredientAlias.query.filter_by(ingredient_id=duplicate.id).update(
+        {IngredientAlias.ingredient_id: keep.id}, synchronize_session=False)
+
+    if keep.unit in GENERIC_UNITS and duplicate.unit not in GENERIC_UNITS:
+        keep.unit = duplicate.unit
+
+    db.session.flush()
+    db.session.delete(duplicate)
+
+
+def canonicalize_ingredients():
+    groups = {}
+    for ingredient in Ingredient.query.order_by(Ingredient.id).all():
+        groups.setdefault(canonical_name(ingredient.name), []).append(ingredient)
+
+    merged = 0
+    for canonical, ingredients in groups.items():
+        keep = ingredients[0]
+        for duplicate in ingredients[1:]:
+            _merge_into(keep, duplicate)
+            merged += 1
+        keep.canonical_name = canonical or None
+
+    db.session.commit()
+    return len(groups), merged
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        try:
+            total, merged = canonicalize_ingredients()
+            print(f"✅ {total} ingredientes canónicos ({merged} duplicados fusionados).")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Error normalizando ingredientes: {e}")
+
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text("CREATE UNIQUE INDEX ix_ingredients_canonical_name ON ingredients (canonical_name)"))
+                conn.commit()
+            print("✅ Índice único de canonical_name creado.")
+        except Exception as e:
+            print(f"⚠️ Error creando el índice (puede que ya exista): {e}")
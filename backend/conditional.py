@@ -0,0 +1,61 @@
+"""
+GET condicionales (ETag / Last-Modified) para ChefCommunity
+Cada endpoint aporta una función de versión barata (una consulta por índice
+sobre las columnas revision/updated_at) y, si el cliente ya tiene esa
+versión, se responde 304 sin cargar ni serializar nada.
+"""
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, make_response, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+
+def current_viewer():
+    """Usuario autenticado (o None); forma parte de la versión si la respuesta depende de él"""
+    verify_jwt_in_request(optional=True)
+    return get_jwt_identity()
+
+
+def conditional(version_func):
+    """
+    version_func(*args, **kwargs) devuelve (partes, last_modified) o None si
+    el recurso no existe (entonces decide la vista). El ETag fuerte es el
+    hash de esas partes más los parámetros de la petición.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_func(*args, **kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+
+            parts, last_modified = version
+            raw = repr((parts, sorted(request.args.items(multi=True))))
+            etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+            if last_modified is not None:
+                last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+            # If-None-Match manda; If-Modified-Since sólo se mira sin él
+            if request.if_none_match:
+                fresh = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                fresh = bool(last_modified and since and last_modified <= since)
+
+            if fresh:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
@@ -2,6 +2,7 @@
 Configuración del backend Flask para ChefCommunity
 """
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -31,6 +32,8 @@ class Config:
     
     # Límite de subida de archivos (32 MB)
     MAX_CONTENT_LENGTH = 32 * 1024 * 1024
+    # Límite del cuerpo NDJSON de POST /api/recipes/import (1 GB)
+    IMPORT_MAX_CONTENT_LENGTH = 1024 * 1024 * 1024
     
     # Configuración JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
@@ -40,3 +43,34 @@ class Config:
     
     # CORS - Permitir frontend en desarrollo y producción
     CORS_ORIGINS = "*"
+
+    # Caché de lecturas anónimas: 'redis' (compartido entre workers), 'memory' (por worker) o 'none'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', '60'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+
+    # Archivos subidos: 'local' (static/uploads) o 's3' (AWS, MinIO u otro compatible)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT')  # por defecto static/uploads
+    STORAGE_PUBLIC_URL = os.getenv('STORAGE_PUBLIC_URL')  # prefijo de las URLs guardadas (s3: por defecto endpoint/bucket o el de AWS)
+    STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET', 'chef-uploads')
+    STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL')  # p.ej. http://storage:9000 para MinIO
+    STORAGE_S3_REGION = os.getenv('STORAGE_S3_REGION')
+    STORAGE_S3_ACCESS_KEY = os.getenv('STORAGE_S3_ACCESS_KEY')
+    STORAGE_S3_SECRET_KEY = os.getenv('STORAGE_S3_SECRET_KEY')
+
+    # Envío de /static/uploads (almacenamiento local): None = Flask envía los bytes,
+    # 'x-accel' = nginx vía X-Accel-Redirect a MEDIA_ACCEL_PREFIX, 'x-sendfile' = Apache/lighttpd
+    MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD') or None
+    MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/_uploads/')
+    # Caché de los archivos con nombre antiguo (los de hash son inmutables)
+    MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', '3600'))
+
+    # Límites por tipo de archivo y subidas por partes (POST /api/uploads/)
+    UPLOAD_MAX_IMAGE_SIZE = int(os.getenv('UPLOAD_MAX_IMAGE_SIZE', str(15 * 1024 * 1024)))
+    UPLOAD_MAX_VIDEO_SIZE = int(os.getenv('UPLOAD_MAX_VIDEO_SIZE', str(1024 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+    # Partes recibidas hasta completar la subida: compartido con el worker (process_images.py)
+    # y, con almacenamiento local, en el mismo disco para moverlas sin copiarlas
+    UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR', os.path.join(tempfile.gettempdir(), 'chef-uploads'))
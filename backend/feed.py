@@ -0,0 +1,111 @@
+"""
+Feed de seguidos (sort=following) para ChefCommunity
+Fan-out al escribir: al publicar, la receta se copia a feed_entries de cada
+seguidor en un único INSERT ... SELECT. Los autores con más de FANOUT_LIMIT
+seguidores pasan a fan-in (users.feed_fan_in): sus recetas no se copian y se
+añaden al leer el timeline (timeline_page). Seguir rellena el timeline con las últimas
+recetas del autor y dejar de seguir las quita.
+"""
+from sqlalchemy import func, literal, select, union
+
+from models import db, insert_ignore, User, Recipe, Follow, FeedEntry
+from pagination import keyset_after
+
+# Seguidores a partir de los que un autor deja de copiarse a cada timeline
+FANOUT_LIMIT = 1000
+
+# Recetas del autor que se copian al empezar a seguirle
+BACKFILL_LIMIT = 200
+
+
+def fan_out_recipes(*recipe_ids):
+    """Copia las recetas al timeline de los seguidores de sus autores (sin commit)"""
+    followers = select(Follow.follower_id, Recipe.id, Recipe.created_at).join(Recipe, Recipe.author_id == Follow.followed_id).join(User, User.id == Recipe.author_id).where(Recipe.id.in_(recipe_ids), User.feed_fan_in.is_(False))
+    db.session.execute(insert_ignore(FeedEntry).from_select(['user_id', 'recipe_id', 'created_at'], followers))
+
+
+def remove_from_feeds(recipe_id):
+    """Quita la receta de todos los timelines (sin commit)"""
+    FeedEntry.query.filter_by(recipe_id=recipe_id).delete(synchronize_session=False)
+
+
+def backfill_follow(follower_id, author_id):
+    """Al seguir: últimas recetas del autor al timeline del seguidor (sin commit)"""
+    recent = select(Recipe.id).where(Recipe.author_id == author_id).order_by(Recipe.created_at.desc(), Recipe.id.desc()).limit(BACKFILL_LIMIT).subquery()
+    rows = select(literal(int(follower_id)), Recipe.id, Recipe.created_at).join(User, User.id == Recipe.author_id).where(Recipe.id.in_(select(recent.c.id)), User.feed_fan_in.is_(False))
+    db.session.execute(insert_ignore(FeedEntry).from_select(['user_id', 'recipe_id', 'created_at'], rows))
+
+
+def prune_follow(follower_id, author_id):
+    """Al dejar de seguir: fuera del timeline las recetas de ese autor (sin commit)"""
+    FeedEntry.query.filter(
+        FeedEntry.user_id == follower_id,
+        FeedEntry.recipe_id.in_(select(Recipe.id).where(Recipe.author_id == author_id))
+    ).delete(synchronize_session=False)
+
+
+def refresh_fan_in(author_id):
+    """
+    Pasa el autor a fan-in al superar FANOUT_LIMIT seguidores. No se vuelve
+    atrás: lo ya copiado sigue en los timelines y lo nuevo se lee al consultar.
+    Devuelve el número de seguidores (el contador ya actualizado por quien llama).
+    """
+    followers = db.session.query(User.followers_count).filter(User.id == author_id).scalar() or 0
+    if followers > FANOUT_LIMIT:
+        User.query.filter(User.id == author_id, User.feed_fan_in.is_(False)).update({User.feed_fan_in: True}, synchronize_session=False)
+    return followers
+
+
+def _fan_in_authors(user_id):
+    return select(Follow.followed_id).join(User, User.id == Follow.followed_id).where(Follow.follower_id == user_id, User.feed_fan_in.is_(True))
+
+
+def timeline_recipe_ids(user_id):
+    """Subconsulta con los ids del timeline: entradas copiadas + recetas de autores fan-in seguidos"""
+    return union(
+        select(FeedEntry.recipe_id).where(FeedEntry.user_id == user_id),
+        select(Recipe.id).where(Recipe.author_id.in_(_fan_in_authors(user_id)))
+    )
+
+
+def timeline_page(user_id, limit=None, after=None):
+    """
+    Página del timeline como [(created_at, recipe_id)] en orden descendente,
+    con hasta limit + 1 elementos para saber si hay más. Recorre feed_entries
+    por ix_feed_entries_user_created y mezcla las recetas de los autores fan-in
+    (ix_recipes_author_created_id), cada fuente acotada a limit + 1.
+    after: (created_at, recipe_id) del cursor
+    """
+    sources = (
+        (select(FeedEntry.created_at, FeedEntry.recipe_id).where(FeedEntry.user_id == user_id), FeedEntry.created_at, FeedEntry.recipe_id),
+        (select(Recipe.created_at, Recipe.id).where(Recipe.author_id.in_(_fan_in_authors(user_id))), Recipe.created_at, Recipe.id),
+    )
+    entries = {}
+    for query, key, recipe_id in sources:
+        if after is not None:
+            query = query.where(keyset_after(key, recipe_id, *after))
+        query = query.order_by(key.desc(), recipe_id.desc())
+        if limit is not None:
+            query = query.limit(limit + 1)
+        # Un autor que pasó a fan-in conserva sus entradas copiadas: sin duplicados
+        for created_at, entry_id in db.session.execute(query):
+            entries[entry_id] = created_at
+    page = sorted(((created_at, entry_id) for entry_id, created_at in entries.items()), reverse=True)
+    return page if limit is None else page[:limit + 1]
+
+
+def rebuild_feeds(batch_size=500):
+    """Recalcula los autores fan-in y regenera todos los timelines desde follows"""
+    FeedEntry.query.delete(synchronize_session=False)
+    User.query.update({User.feed_fan_in: False}, synchronize_session=False)
+    popular = select(Follow.followed_id).group_by(Follow.followed_id).having(func.count() > FANOUT_LIMIT)
+    User.query.filter(User.id.in_(popular)).update({User.feed_fan_in: True}, synchronize_session=False)
+    db.session.commit()
+
+    follows = db.session.query(Follow.follower_id, Follow.followed_id).join(User, User.id == Follow.followed_id).filter(User.feed_fan_in.is_(False)).all()
+    for position, (follower_id, author_id) in enumerate(follows, start=1):
+        backfill_follow(follower_id, author_id)
+        if position % batch_size == 0:
+            db.session.commit()
+    db.session.commit()
+    return len(follows)
@@ -1,16 +1,83 @@
 from app import app, db
 from sqlalchemy import text
 
+# Columnas añadidas después de la creación inicial de las tablas
+# (db.create_all no altera tablas existentes)
+COLUMNS = [
+    ("recipes", "calories", "INT"),
+    ("recipes", "likes_count", "INT NOT NULL DEFAULT 0"),
+    ("recipes", "rating_sum", "INT NOT NULL DEFAULT 0"),
+    ("recipes", "reviews_count", "INT NOT NULL DEFAULT 0"),
+    ("ingredients", "canonical_name", "VARCHAR(100) NULL"),
+    ("users", "revision", "INT NOT NULL DEFAULT 1"),
+    ("users", "updated_at", "DATETIME NULL DEFAULT CURRENT_TIMESTAMP"),
+    ("recipes", "revision", "INT NOT NULL DEFAULT 1"),
+    ("recipes", "updated_at", "DATETIME NULL DEFAULT CURRENT_TIMESTAMP"),
+    ("recipe_collections", "revision", "INT NOT NULL DEFAULT 1"),
+    ("recipe_collections", "updated_at", "DATETIME NULL DEFAULT CURRENT_TIMESTAMP"),
+    ("users", "feed_fan_in", "BOOLEAN NOT NULL DEFAULT 0"),
+    ("meal_plan", "created_at", "DATETIME NULL DEFAULT CURRENT_TIMESTAMP"),
+    ("users", "avatar_variants", "JSON NULL"),
+    ("recipes", "image_variants", "JSON NULL"),
+    ("recipe_steps", "image_variants", "JSON NULL"),
+    ("reviews", "image_variants", "JSON NULL"),
+    ("recipes", "rating_1_count", "INT NOT NULL DEFAULT 0"),
+    ("recipes", "rating_2_count", "INT NOT NULL DEFAULT 0"),
+    ("recipes", "rating_3_count", "INT NOT NULL DEFAULT 0"),
+    ("recipes", "rating_4_count", "INT NOT NULL DEFAULT 0"),
+    ("recipes", "rating_5_count", "INT NOT NULL DEFAULT 0"),
+    ("users", "followers_count", "INT NOT NULL DEFAULT 0"),
+    ("users", "following_count", "INT NOT NULL DEFAULT 0"),
+    ("upload_sessions", "claimed_at", "DATETIME NULL"),
+    ("recipe_collections", "recipe_count", "INT NOT NULL DEFAULT 0"),
+]
+
+# Columnas existentes cuya definición cambió (p.ej. valores nuevos de un ENUM)
+MODIFIED_COLUMNS = [
+    ("upload_sessions", "status", "ENUM('uploading', 'processing', 'complete', 'failed') NOT NULL DEFAULT 'uploading'"),
+]
+
+INDEXES = [
+    ("recipes", "ix_recipes_created_at_id", "created_at, id"),
+    ("recipes", "ix_recipes_likes_count_id", "likes_count, id"),
+    ("recipes", "ix_recipes_author_created_id", "author_id, created_at, id"),
+    ("recipe_ingredients", "ix_recipe_ingredients_ingredient_id", "ingredient_id"),
+    ("likes", "ix_likes_created_at", "created_at"),
+    ("reviews", "ix_reviews_created_at", "created_at"),
+    ("reviews", "ix_reviews_recipe_created_id", "recipe_id, created_at, id"),
+    ("follows", "ix_follows_followed_created", "followed_id, created_at, follower_id"),
+    ("follows", "ix_follows_follower_created", "follower_id, created_at, followed_id"),
+    ("meal_plan", "ix_meal_plan_created_at", "created_at"),
+]
+
 def update_schema():
     with app.app_context():
-        try:
-            # Intentar añadir la columna calories
-            with db.engine.connect() as conn:
-                conn.execute(text("ALTER TABLE recipes ADD COLUMN calories INT"))
-                conn.commit()
-            print("✅ Columna 'calories' añadida exitosamente.")
-        except Exception as e:
-            print(f"⚠️ Error (puede que ya exista): {e}")
+        for table, column, ddl in COLUMNS:
+            try:
+                with db.engine.connect() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                    conn.commit()
+                print(f"✅ Columna '{column}' añadida exitosamente.")
+            except Exception as e:
+                print(f"⚠️ Error en '{column}' (puede que ya exista): {e}")
+
+        for table, column, ddl in MODIFIED_COLUMNS:
+            try:
+                with db.engine.connect() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} MODIFY COLUMN {column} {ddl}"))
+                    conn.commit()
+                print(f"✅ Columna '{column}' actualizada exitosamente.")
+            except Exception as e:
+                print(f"⚠️ Error actualizando '{column}': {e}")
+
+        for table, name, columns in INDEXES:
+            try:
+                with db.engine.connect() as conn:
+                    conn.execute(text(f"CREATE INDEX {name} ON {table} ({columns})"))
+                    conn.commit()
+                print(f"✅ Índice '{name}' creado exitosamente.")
+            except Exception as e:
+                print(f"⚠️ Error en '{name}' (puede que ya exista): {e}")
 
 if __name__ == "__main__":
     update_schema()
@@ -0,0 +1,138 @@
+"""
+Importación masiva de recetas para ChefCommunity
+Entrada NDJSON: una receta por línea con el mismo formato que POST /api/recipes/
+(ingredients y steps como listas). Se procesa por bloques de CHUNK_SIZE:
+ingredientes resueltos en bloque, hijos insertados con executemany y una
+transacción por bloque. La memoria queda acotada al bloque en curso.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from cache import invalidate_recipes
+from feed import fan_out_recipes
+from ingredients import parse_ingredient_lines, sum_quantities, resolve_ingredient_ids, update_generic_units
+from models import db, Recipe, RecipeIngredient, RecipeStep, RecipeChange, SearchTerm
+from search import document_terms
+
+CHUNK_SIZE = 500
+
+DIFFICULTIES = ('Fácil', 'Media', 'Difícil')
+
+
+def _parse_record(line):
+    """Valida una línea y devuelve la receta como dict (ValueError si no es válida)"""
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError('Cada línea debe ser un objeto JSON')
+    if not (record.get('title') or '').strip() or not (record.get('instructions') or '').strip():
+        raise ValueError('Título e instrucciones son requeridos')
+    if record.get('difficulty', 'Media') not in DIFFICULTIES:
+        raise ValueError(f"Dificultad no válida: {record.get('difficulty')}")
+    for key in ('ingredients', 'steps'):
+        if not isinstance(record.get(key) or [], list):
+            raise ValueError(f"'{key}' debe ser una lista")
+    if record.get('created_at'):
+        record['created_at'] = datetime.fromisoformat(record['created_at'])
+    return record
+
+
+def _insert_chunk(chunk, default_author_id):
+    """
+    Inserta un bloque [(línea, receta)] en la transacción actual (sin commit)
+    y devuelve [(línea, recipe_id)]. MySQL no tiene RETURNING, así que cada
+    receta es un INSERT propio para conocer su id; ingredientes, pasos,
+    términos de búsqueda y registro de cambios van en un executemany por tabla.
+    """
+    lines_by_record = [parse_ingredient_lines(record.get('ingredients') or []) for _, record in chunk]
+    ingredient_ids = resolve_ingredient_ids({name for lines in lines_by_record for name, _, _ in lines})
+
+    created = []
+    ingredient_rows, step_rows, term_rows = [], [], []
+    units = {}
+    for (line_number, record), lines in zip(chunk, lines_by_record):
+        values = {
+            'title': record['title'].strip(),
+            'description': record.get('description', ''),
+            'instructions': record['instructions'],
+            'category': record.get('category'),
+            'video_url': record.get('video_url'),
+            'main_image_url': record.get('main_image_url'),
+            'difficulty': record.get('difficulty', 'Media'),
+            'prep_time': record.get('prep_time', 0),
+            'calories': record.get('calories', 0),
+            'author_id': record.get('author_id') or default_author_id,
+        }
+        if record.get('created_at'):
+            values['created_at'] = record['created_at']
+        recipe_id = db.session.execute(insert(Recipe).values(**values)).inserted_primary_key[0]
+        created.append((line_number, recipe_id))
+
+        quantities, recipe_units = sum_quantities(lines, ingredient_ids)
+        for ingredient_id, unit in recipe_units.items():
+            units.setdefault(ingredient_id, unit)
+        ingredient_rows += [
+            {'recipe_id': recipe_id, 'ingredient_id': ingredient_id, 'quantity': qty_val}
+            for ingredient_id, qty_val in quantities.items()
+        ]
+
+        steps = []
+        for i, step_data in enumerate(record.get('steps') or []):
+            step_text = (step_data.get('text') or '').strip()
+            if step_text:
+                steps.append(step_text)
+                step_rows.append({'recipe_id': recipe_id, 'step_number': i + 1, 'text': step_text, 'image_url': step_data.get('image_url')})
+
+        terms = document_terms(values['title'], values['description'], [name for name, _, _ in lines if name in ingredient_ids], values['instructions'], steps)
+        term_rows += [{'term': term, 'recipe_id': recipe_id, 'weight': weight} for term, weight in terms.items()]
+
+    for model, rows in ((RecipeIngredient, ingredient_rows), (RecipeStep, step_rows), (SearchTerm, term_rows)):
+        if rows:
+            db.session.execute(insert(model), rows)
+    db.session.execute(insert(RecipeChange), [{'recipe_id': recipe_id} for _, recipe_id in created])
+    update_generic_units(units)
+    fan_out_recipes(*[recipe_id for _, recipe_id in created])
+    return created
+
+
+def _commit_chunk(chunk, default_author_id):
+    try:
+        created = _insert_chunk(chunk, default_author_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if len(chunk) == 1:
+            yield {'line': chunk[0][0], 'status': 'error', 'error': str(e)}
+            return
+        # Se repite receta a receta para aislar las que fallan
+        for item in chunk:
+            yield from _commit_chunk([item], default_author_id)
+        return
+    invalidate_recipes()
+    for line_number, recipe_id in created:
+        yield {'line': line_number, 'status': 'created', 'id': recipe_id}
+
+
+def import_recipes(lines, default_author_id, chunk_size=CHUNK_SIZE):
+    """
+    Importa un iterable de líneas NDJSON (str o bytes) y va devolviendo un
+    resultado por línea: {'line', 'status': 'created', 'id'} o
+    {'line', 'status': 'error', 'error'}. Las líneas vacías se ignoran.
+    """
+    chunk = []
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            chunk.append((line_number, _parse_record(line)))
+        except (ValueError, TypeError) as e:
+            yield {'line': line_number, 'status': 'error', 'error': str(e)}
+            continue
+        if len(chunk) >= chunk_size:
+            yield from _commit_chunk(chunk, default_author_id)
+            chunk = []
+    if chunk:
+        yield from _commit_chunk(chunk, default_author_id)
@@ -0,0 +1,208 @@
+"""
+Catálogo canónico de ingredientes para ChefCommunity
+"Tomate", "tomates" y "tomate " comparten nombre canónico ('tomate') y por
+tanto una única fila en ingredients; los sinónimos se registran en
+ingredient_aliases. Cada worker guarda un caché nombre canónico -> id que se
+carga una vez y se amplía con cada inserción confirmada.
+"""
+import re
+import threading
+
+from sqlalchemy import event, insert, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, Ingredient, IngredientAlias
+from search import fold_accents, stem
+
+GENERIC_UNITS = ['unit', 'ud']
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def canonical_name(name):
+    """Forma canónica: minúsculas, sin tildes ni signos y con cada palabra en singular"""
+    words = _WORD_RE.findall(fold_accents(name or ''))
+    return ' '.join(stem(word) for word in words)[:100]
+
+
+def parse_quantity(qty_str):
+    """Separa '200 g' / '1.5kg' / '3' en (cantidad, unidad normalizada)"""
+    qty_str = str(qty_str or '0').strip()
+    match = re.search(r"^([-+]?\d*\.?\d+)\s*([a-zA-ZñÑ]*)$", qty_str)
+
+    if match:
+        qty_val = float(match.group(1))
+        unit_str = match.group(2).lower() if match.group(2) else 'ud'
+    else:
+        qty_match = re.search(r"[-+]?\d*\.\d+|\d+", qty_str)
+        qty_val = float(qty_match.group()) if qty_match else 0
+        unit_str = 'ud'
+
+    if unit_str in ['g', 'gr', 'gramos']: unit_str = 'g'
+    if unit_str in ['kg', 'kilos']: unit_str = 'kg'
+    if unit_str in ['ml', 'mililitros']: unit_str = 'ml'
+    if unit_str in ['l', 'litros']: unit_str = 'L'
+    if unit_str in ['oz', 'ounce', 'ounces']: unit_str = 'oz'
+    if unit_str in ['lb', 'pound', 'pounds']: unit_str = 'lb'
+    return qty_val, unit_str
+
+
+def parse_ingredient_lines(ingredients_list):
+    """[{'name', 'quantity'}] -> [(nombre, cantidad, unidad)] sin las líneas sin nombre"""
+    lines = []
+    for ing_data in ingredients_list:
+        name = (ing_data.get('name') or '').strip()
+        if not name:
+            continue
+        qty_val, unit_str = parse_quantity(ing_data.get('quantity', '0'))
+        lines.append((name, qty_val, unit_str))
+    return lines
+
+
+def sum_quantities(lines, ingredient_ids):
+    """
+    Agrupa las líneas por ingrediente del catálogo: 'tomate' y 'tomates' son
+    el mismo y se suman. Devuelve ({ingredient_id: cantidad}, {ingredient_id: unidad}).
+    """
+    quantities = {}
+    units = {}
+    for name, qty_val, unit_str in lines:
+        ingredient_id = ingredient_ids.get(name)
+        if not ingredient_id:
+            continue
+        quantities[ingredient_id] = quantities.get(ingredient_id, 0) + qty_val
+        units.setdefault(ingredient_id, unit_str)
+    return quantities, units
+
+
+class IngredientCatalog:
+    """Caché por worker de nombre canónico (o alias) -> ingredient_id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._warm = False
+
+    def warm(self):
+        """Carga el catálogo completo la primera vez que se usa en el worker"""
+        with self._lock:
+            if self._warm:
+                return
+            for ingredient_id, name, canonical in db.session.execute(
+                select(Ingredient.id, Ingredient.name, Ingredient.canonical_name)
+            ):
+                self._ids.setdefault(canonical or canonical_name(name), ingredient_id)
+            for alias, ingredient_id in db.session.execute(
+                select(IngredientAlias.alias, IngredientAlias.ingredient_id)
+            ):
+                self._ids[alias] = ingredient_id
+            self._warm = True
+
+    def lookup(self, canonical):
+        return self._ids.get(canonical)
+
+    def remember(self, mapping):
+        with self._lock:
+            self._ids.update(mapping)
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = {}
+            self._warm = False
+
+
+catalog = IngredientCatalog()
+
+
+# Los ids insertados sólo pasan al caché cuando la transacción se confirma
+@event.listens_for(Session, 'after_commit')
+def _promote_pending_ingredients(session):
+    pending = session.info.pop('pending_ingredients', None)
+    if pending:
+        catalog.remember(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_ingredients(session):
+    session.info.pop('pending_ingredients', None)
+
+
+def _lookup_in_db(canonicals):
+    """Una sola consulta contra ingredientes y alias"""
+    query = union_all(
+        select(Ingredient.canonical_name.label('key'), Ingredient.id.label('ingredient_id'))
+        .where(Ingredient.canonical_name.in_(canonicals)),
+        select(IngredientAlias.alias.label('key'), IngredientAlias.ingredient_id.label('ingredient_id'))
+        .where(IngredientAlias.alias.in_(canonicals)),
+    )
+    return {key: ingredient_id for key, ingredient_id in db.session.execute(query)}
+
+
+def resolve_ingredient_ids(names, create=True):
+    """
+    Resuelve en bloque nombres escritos por el usuario a ids del catálogo.
+    Con el caché caliente no hay consultas; los que falten se buscan en una
+    única consulta y, si create, se insertan todos juntos.
+    Devuelve {nombre: ingredient_id} (sin los nombres vacíos o no resueltos).
+    """
+    catalog.warm()
+    pending = db.session.info.setdefault('pending_ingredients', {})
+
+    canonicals = {}
+    for name in names:
+        canonical = canonical_name(name)
+        if canonical:
+            canonicals[name] = canonical
+
+    found = {}
+    missing = set()
+    for canonical in canonicals.values():
+        ingredient_id = catalog.lookup(canonical) or pending.get(canonical)
+        if ingredient_id:
+            found[canonical] = ingredient_id
+        else:
+            missing.add(canonical)
+
+    if missing:
+        # Pueden haberlos creado otros workers
+        from_db = _lookup_in_db(missing)
+        catalog.remember(from_db)
+        found.update(from_db)
+        missing -= set(from_db)
+
+    if missing and create:
+        rows, seen = [], set()
+        for name, canonical in canonicals.items():
+            if canonical in missing and canonical not in seen:
+                seen.add(canonical)
+                rows.append({'name': name.strip()[:100], 'canonical_name': canonical, 'unit': 'ud'})
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(Ingredient), rows)
+        except IntegrityError:
+            # Otro worker insertó alguno a la vez: se releen y se insertan los restantes
+            created = _lookup_in_db(missing)
+            remaining = [row for row in rows if row['canonical_name'] not in created]
+            if remaining:
+                db.session.execute(insert(Ingredient), remaining)
+        created = {
+            canonical: ingredient_id for canonical, ingredient_id in db.session.execute(
+                select(Ingredient.canonical_name, Ingredient.id).where(Ingredient.canonical_name.in_(missing))
+            )
+        }
+        pending.update(created)
+        found.update(created)
+
+    return {name: found[canonical] for name, canonical in canonicals.items() if canonical in found}
+
+
+def update_generic_units(units_by_id):
+    """Asigna la unidad usada en la receta a los ingredientes que aún tienen una genérica"""
+    by_unit = {}
+    for ingredient_id, unit in units_by_id.items():
+        if unit and unit not in GENERIC_UNITS:
+            by_unit.setdefault(unit, []).append(ingredient_id)
+    for unit, ids in by_unit.items():
+        Ingredient.query.filter(Ingredient.id.in_(ids), Ingredient.unit.in_(GENERIC_UNITS)).update(
+            {Ingredient.unit: unit}, synchronize_session=False)
@@ -0,0 +1,31 @@
+"""
+Proyecciones de los listados de recetas
+?view=card devuelve sólo lo que pinta RecipeCard (Recipe.to_card_dict) y
+?fields=a,b,c recorta la respuesta a esas claves. Si todas las claves pedidas
+son de la tarjeta también se usa la proyección ligera en SQL.
+"""
+
+CARD_FIELDS = {
+    'id', 'title', 'category', 'video_url', 'main_image_url', 'card_image_url', 'difficulty', 'prep_time',
+    'calories', 'author_id', 'likes_count', 'avg_rating', 'reviews_count', 'created_at',
+    'author', 'author_avatar',
+}
+
+# Claves que añade el modo nevera a cada receta del listado
+PANTRY_FIELDS = {'missing_ingredients', 'is_complete', 'is_suggestion'}
+
+
+def parse_projection(args):
+    """Devuelve (card, fields): si basta la tarjeta y el conjunto de claves pedido (o None)"""
+    fields = None
+    if args.get('fields'):
+        fields = {f.strip() for f in args['fields'].split(',') if f.strip()} | {'id'}
+    card = args.get('view') == 'card' or (fields is not None and fields <= CARD_FIELDS | PANTRY_FIELDS)
+    return card, fields
+
+
+def project(data, fields):
+    """Recorta un dict serializado a las claves pedidas"""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
@@ -0,0 +1,289 @@
+"""
+Imágenes subidas y sus variantes redimensionadas
+Las rutas guardan el original con save_image y responden enseguida: la fila
+ImageAsset entra pendiente en la misma transacción que la receta/review/perfil
+y process_images.py genera fuera de la petición las variantes (thumb, card y
+full, en WebP y JPEG) y las anota en la columna *_variants de las filas que
+usan esa imagen. Mientras tanto los clientes siguen viendo el original.
+
+El mismo worker termina las subidas por partes (finalize_uploads): calcula
+el hash del archivo completo y lo mueve a su clave fuera de la petición que
+trajo el último trozo.
+"""
+import io
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+
+from cache import invalidate_recipes
+from models import db, ImageAsset, Recipe, RecipeStep, Review, User, UploadSession
+from storage import storage
+
+# Lado mayor en píxeles de cada variante (nunca se amplía el original)
+VARIANTS = {'thumb': 160, 'card': 480, 'full': 1280}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+MAX_ATTEMPTS = 3
+# Un trabajo 'processing' más antiguo que esto se da por abandonado (worker caído)
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+# Columnas que guardan una imagen subida y dónde van sus variantes
+IMAGE_COLUMNS = [
+    (Recipe, 'main_image_url', 'image_variants'),
+    (RecipeStep, 'image_url', 'image_variants'),
+    (Review, 'image_url', 'image_variants'),
+    (User, 'avatar_url', 'avatar_variants'),
+]
+
+
+# Bytes necesarios para reconocer el formato
+SNIFF_BYTES = 32
+
+
+class InvalidUpload(ValueError):
+    """Archivo rechazado por tamaño o formato; status es el código HTTP de la respuesta"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff(head):
+    """Tipo real a partir de los primeros bytes: (kind, content_type) o (None, None)"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image', 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image', 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image', 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image', 'image/webp'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'video', 'video/webm'  # WebM / Matroska
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand == b'qt  ':
+            return 'video', 'video/quicktime'
+        # HEIF/AVIF también son ftyp pero son imágenes que Pillow no abre
+        if brand not in (b'heic', b'heix', b'avif', b'mif1', b'msf1'):
+            return 'video', 'video/mp4'
+    return None, None
+
+
+def upload_limit(kind):
+    return current_app.config['UPLOAD_MAX_VIDEO_SIZE' if kind == 'video' else 'UPLOAD_MAX_IMAGE_SIZE']
+
+
+def check_size(kind, size):
+    limit = upload_limit(kind)
+    if size > limit:
+        raise InvalidUpload(f'El archivo supera el máximo de {limit // (1024 * 1024)} MB', 413)
+
+
+def check_content(kind, head):
+    """Devuelve el content type detectado si el contenido es del tipo esperado"""
+    detected, content_type = sniff(head)
+    if detected != kind:
+        raise InvalidUpload('Formato de imagen no admitido (JPEG, PNG, GIF o WebP)' if kind == 'image' else 'Formato de vídeo no admitido (MP4, MOV o WebM)', 415)
+    return content_type
+
+
+def save_upload(file, kind):
+    """
+    Valida y guarda un archivo de un formulario multipart (FileStorage) y
+    devuelve su URL. La extensión sale del contenido, no del nombre.
+    """
+    stream = file.stream
+    head = stream.read(SNIFF_BYTES)
+    stream.seek(0, os.SEEK_END)
+    check_size(kind, stream.tell())
+    content_type = check_content(kind, head)
+    stream.seek(0)
+    return storage.save(stream, content_type=content_type)
+
+
+def save_image(file):
+    """save_upload + encola la generación de variantes (sin commit)"""
+    url = save_upload(file, 'image')
+    db.session.add(ImageAsset(original_url=url))
+    return url
+
+
+def completed_upload_url(upload_id, user_id, kind):
+    """URL de una subida por partes ya terminada del usuario (ver routes/uploads.py)"""
+    session = db.session.get(UploadSession, upload_id)
+    if session is not None and str(session.user_id) == str(user_id) and session.kind == kind and session.status == 'processing':
+        raise InvalidUpload(f'La subida {upload_id} todavía se está procesando', 409)
+    if session is None or str(session.user_id) != str(user_id) or session.kind != kind or session.status != 'complete':
+        raise InvalidUpload(f'Subida {upload_id} no encontrada o incompleta')
+    return session.url
+
+
+def partial_upload_path(upload_id):
+    """Archivo parcial de una subida por partes (UPLOAD_TMP_DIR, compartido con el worker)"""
+    folder = current_app.config['UPLOAD_TMP_DIR']
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, upload_id)
+
+
+def finalize_uploads(limit=10):
+    """
+    Pasa al almacenamiento las subidas por partes completas ('processing'):
+    una lectura para el hash y un rename en local (o la subida por partes de
+    boto3 en S3). Encola las variantes si es una imagen. Devuelve (terminadas, fallidas).
+    """
+    now = datetime.utcnow()
+    claimable = (UploadSession.status == 'processing') & or_(UploadSession.claimed_at.is_(None), UploadSession.claimed_at < now - CLAIM_TIMEOUT)
+    sessions = UploadSession.query.filter(claimable).order_by(UploadSession.updated_at).limit(limit).with_for_update(skip_locked=True).all()
+    claimed = [session.id for session in sessions]
+    for session in sessions:
+        session.claimed_at = now
+    db.session.commit()
+
+    done = failed = 0
+    for upload_id in claimed:
+        session = db.session.get(UploadSession, upload_id)
+        try:
+            session.url = storage.adopt(partial_upload_path(upload_id), content_type=session.content_type)
+            session.status = 'complete'
+            if session.kind == 'image':
+                db.session.add(ImageAsset(original_url=session.url))
+            db.session.commit()
+            done += 1
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error finalizando la subida {upload_id}: {e}")
+            # Con el parcial aún en disco se reintenta pasado CLAIM_TIMEOUT
+            if not os.path.exists(partial_upload_path(upload_id)):
+                UploadSession.query.filter_by(id=upload_id).update({'status': 'failed'})
+                db.session.commit()
+            failed += 1
+    return done, failed
+
+
+def _load_image(key):
+    from PIL import Image  # dependencia sólo del worker
+    with storage.open(key) as source:
+        return Image.open(io.BytesIO(source.read()))
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    buffer.seek(0)
+    return buffer
+
+
+def _render_variants(url):
+    """
+    Guarda las variantes en variants/ y devuelve {nombre: {webp, jpeg, width, height}}.
+    Sus claves derivan de la del original, así que una imagen repetida
+    reutiliza las variantes ya generadas.
+    """
+    from PIL import Image, ImageOps  # dependencia sólo del worker
+
+    key = storage.key_for_url(url)
+    if key is None:
+        raise ValueError(f'La imagen no está en el almacenamiento: {url}')
+    stem = os.path.splitext(key.rsplit('/', 1)[-1])[0]
+    keys = {name: (f'variants/{stem}_{name}.webp', f'variants/{stem}_{name}.jpg') for name in VARIANTS}
+
+    variants = {}
+    if all(storage.exists(webp_key) and storage.exists(jpeg_key) for webp_key, jpeg_key in keys.values()):
+        for name, (webp_key, jpeg_key) in keys.items():
+            with _load_image(webp_key) as existing:
+                variants[name] = {'webp': storage.url(webp_key), 'jpeg': storage.url(jpeg_key), 'width': existing.width, 'height': existing.height}
+        return variants
+
+    with _load_image(key) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        for name, size in VARIANTS.items():
+            webp_key, jpeg_key = keys[name]
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            storage.put(_encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4), webp_key, 'image/webp')
+            # JPEG no admite transparencia: se aplana sobre blanco
+            if resized.mode == 'RGBA':
+                flat = Image.new('RGB', resized.size, (255, 255, 255))
+                flat.paste(resized, mask=resized.getchannel('A'))
+                resized = flat
+            storage.put(_encode(resized, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True), jpeg_key, 'image/jpeg')
+            variants[name] = {'webp': storage.url(webp_key), 'jpeg': storage.url(jpeg_key), 'width': resized.width, 'height': resized.height}
+    return variants
+
+
+def _apply_variants(url, variants):
+    """
+    Copia las variantes a las filas que usan esa imagen (sin commit) y
+    devuelve los ids de receta cuya respuesta cambia.
+    """
+    recipe_ids = set()
+    for model, url_column, variants_column in IMAGE_COLUMNS:
+        ids = [row_id for row_id, in db.session.query(model.id).filter(getattr(model, url_column) == url)]
+        if not ids:
+            continue
+        values = {getattr(model, variants_column): variants}
+        if hasattr(model, 'touch'):
+            model.touch(*ids, values=values)
+        else:
+            model.query.filter(model.id.in_(ids)).update(values, synchronize_session=False)
+
+        if model is Recipe:
+            recipe_ids.update(ids)
+        elif model is User:
+            # El avatar sale en las tarjetas de sus recetas
+            authored = [recipe_id for recipe_id, in db.session.query(Recipe.id).filter(Recipe.author_id.in_(ids))]
+            Recipe.touch(*authored)
+            recipe_ids.update(authored)
+        else:
+            parents = [recipe_id for recipe_id, in db.session.query(model.recipe_id).filter(model.id.in_(ids)).distinct()]
+            Recipe.touch(*parents)
+            recipe_ids.update(parents)
+    return recipe_ids
+
+
+def _claim(limit):
+    """Marca como 'processing' hasta limit trabajos y devuelve [(id, url)]"""
+    now = datetime.utcnow()
+    claimable = or_(
+        ImageAsset.status == 'pending',
+        (ImageAsset.status == 'processing') & (ImageAsset.claimed_at < now - CLAIM_TIMEOUT),
+    )
+    jobs = ImageAsset.query.filter(claimable, ImageAsset.attempts < MAX_ATTEMPTS).order_by(ImageAsset.id).limit(limit).with_for_update(skip_locked=True).all()
+    claimed = [(job.id, job.original_url) for job in jobs]
+    for job in jobs:
+        job.status = 'processing'
+        job.attempts += 1
+        job.claimed_at = now
+    db.session.commit()
+    return claimed
+
+
+def process_pending(limit=50):
+    """
+    Genera las variantes de hasta limit imágenes pendientes. Cada imagen se
+    confirma por separado para que un archivo dañado no frene al resto.
+    Devuelve (procesadas, fallidas).
+    """
+    done = failed = 0
+    for job_id, url in _claim(limit):
+        try:
+            variants = _render_variants(url)
+            recipe_ids = _apply_variants(url, variants)
+            ImageAsset.query.filter_by(id=job_id).update({'status': 'ready', 'error': None, 'processed_at': datetime.utcnow()})
+            db.session.commit()
+            invalidate_recipes(*recipe_ids)
+            done += 1
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ImageAsset, job_id)
+            job.status = 'failed' if job.attempts >= MAX_ATTEMPTS else 'pending'
+            job.error = str(e)[:255]
+            db.session.commit()
+            failed += 1
+    return done, failed
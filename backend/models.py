@@ -3,12 +3,54 @@ Modelos SQLAlchemy para ChefCommunity
 Mapean las tablas de MySQL definidas en create_database.sql
 """
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func, insert, select, union_all
+from sqlalchemy.orm import joinedload, load_only, selectinload
 from datetime import datetime
 
 db = SQLAlchemy()
 
 
-class User(db.Model):
+def insert_ignore(model):
+    """INSERT que omite en silencio las filas cuya clave ya existe (INSERT IGNORE en MySQL)"""
+    return insert(model).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+
+
+def variant_url(variants, name):
+    """URL WebP de una variante ('thumb', 'card', 'full') si ya está generada (ver media.py)"""
+    return ((variants or {}).get(name) or {}).get('webp')
+
+
+class Versioned:
+    """
+    Revisión y fecha de modificación para ETag / Last-Modified. Los cambios de
+    columnas vía ORM la incrementan solos; las escrituras que no pasan por el
+    objeto (UPDATE masivos, filas hijas, tablas intermedias) llaman a touch.
+    """
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
+
+    @classmethod
+    def touch(cls, *ids, values=None):
+        """
+        Incrementa la revisión de esas filas en la transacción actual (sin
+        commit); values añade otras columnas al mismo UPDATE.
+        """
+        if ids:
+            cls.query.filter(cls.id.in_(ids)).update({
+                cls.revision: cls.revision + 1,
+                cls.updated_at: datetime.utcnow(),
+                **(values or {})
+            }, synchronize_session=False)
+
+
+@event.listens_for(Versioned, 'before_update', propagate=True)
+def _bump_revision(mapper, connection, target):
+    if db.session.is_modified(target, include_collections=False):
+        target.revision = type(target).revision + 1
+        target.updated_at = datetime.utcnow()
+
+
+class User(Versioned, db.Model):
     """Modelo de usuarios"""
     __tablename__ = 'users'
     
@@ -19,7 +61,15 @@ class User(db.Model):
     rol = db.Column(db.Enum('saludable', 'aprendiz', 'chef', 'admin'), default='aprendiz')
     bio = db.Column(db.Text)
     avatar_url = db.Column(db.String(255))
+    avatar_variants = db.Column(db.JSON)  # variantes redimensionadas de avatar_url
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    # Autores con muchos seguidores: sus recetas se leen al consultar el feed
+    # en lugar de copiarse a cada timeline (ver feed.py)
+    feed_fan_in = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    # Contadores desnormalizados, mantenidos al seguir/dejar de seguir y al borrar usuarios
+    # (rebuild_counters.py los recalcula desde follows)
+    followers_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    following_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relaciones
     recipes = db.relationship('Recipe', backref='author_user', lazy=True, cascade='all, delete-orphan')
@@ -39,9 +89,20 @@ class User(db.Model):
             'rol': self.rol,
             'bio': self.bio,
             'avatar_url': self.avatar_url,
+            'avatar_variants': self.avatar_variants,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'followers_count': len(self.followers),
-            'following_count': len(self.following)
+            'followers_count': self.followers_count or 0,
+            'following_count': self.following_count or 0
+        }
+
+    def to_summary_dict(self):
+        """Datos de las listas de seguidores/seguidos"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'rol': self.rol,
+            'avatar_url': variant_url(self.avatar_variants, 'thumb') or self.avatar_url,
+            'followers_count': self.followers_count or 0
         }
 
 
@@ -51,6 +112,8 @@ class Ingredient(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
+    # Forma normalizada del nombre (ver ingredients.canonical_name)
+    canonical_name = db.Column(db.String(100), unique=True)
     unit = db.Column(db.String(20))
     
     def __init__(self, **kwargs):
@@ -64,7 +127,27 @@ class Ingredient(db.Model):
         }
 
 
-class Recipe(db.Model):
+class IngredientAlias(db.Model):
+    """Sinónimos de ingredientes por nombre canónico (p.ej. 'jitomate' -> tomate)"""
+    __tablename__ = 'ingredient_aliases'
+    
+    alias = db.Column(db.String(100), primary_key=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id'), nullable=False, index=True)
+    
+    ingredient = db.relationship('Ingredient', lazy=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    def to_dict(self):
+        return {
+            'alias': self.alias,
+            'ingredient_id': self.ingredient_id,
+            'ingredient': self.ingredient.name if self.ingredient else None
+        }
+
+
+class Recipe(Versioned, db.Model):
     """Modelo de recetas"""
     __tablename__ = 'recipes'
     
@@ -75,12 +158,31 @@ class Recipe(db.Model):
     category = db.Column(db.String(50))
     video_url = db.Column(db.String(255))
     main_image_url = db.Column(db.String(255))
+    image_variants = db.Column(db.JSON)  # variantes redimensionadas de main_image_url
     difficulty = db.Column(db.Enum('Fácil', 'Media', 'Difícil'), default='Media')
     prep_time = db.Column(db.Integer)  # en minutos
     calories = db.Column(db.Integer)   # Calorías por porción
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     
+    # Contadores desnormalizados, mantenidos en toggle_like / add_review
+    # (rebuild_counters.py los recalcula desde likes y reviews)
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    reviews_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Histograma de valoraciones: reviews con 1, 2... 5 estrellas
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    __table_args__ = (
+        db.Index('ix_recipes_created_at_id', 'created_at', 'id'),
+        db.Index('ix_recipes_likes_count_id', 'likes_count', 'id'),
+        db.Index('ix_recipes_author_created_id', 'author_id', 'created_at', 'id'),
+    )
+    
     # Relaciones
     ingredients = db.relationship('RecipeIngredient', backref='recipe', lazy=True, cascade='all, delete-orphan')
     steps = db.relationship('RecipeStep', backref='recipe', lazy=True, cascade='all, delete-orphan', order_by='RecipeStep.step_number')
@@ -90,31 +192,74 @@ class Recipe(db.Model):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def to_dict(self, include_author=True, include_ingredients=True):
-        # Calcular calificación promedio
-        ratings = [r.rating for r in self.reviews if r.rating]
-        avg_rating = sum(ratings) / len(ratings) if ratings else 0
+    @classmethod
+    def rating_column(cls, rating):
+        """Columna del histograma para una valoración de 1 a 5"""
+        return getattr(cls, f'rating_{int(rating)}_count')
+
+    @classmethod
+    def eager_options(cls, include_author=True):
+        """
+        Estrategia de carga que necesita to_dict: todas las relaciones que
+        serializa se traen en un número fijo de consultas (selectin por
+        colección, join para el autor) en lugar de una por receta.
+        """
+        options = [
+            selectinload(cls.ingredients).joinedload(RecipeIngredient.ingredient),
+            selectinload(cls.steps),
+        ]
+        if include_author:
+            options.append(joinedload(cls.author_user))
+        return options
+
+    @classmethod
+    def card_options(cls, include_author=True):
+        """
+        Proyección de to_card_dict: sólo las columnas pequeñas de la tarjeta,
+        sin description/instructions ni tablas hijas.
+        """
+        options = [load_only(
+            cls.id, cls.title, cls.category, cls.video_url, cls.main_image_url, cls.image_variants,
+            cls.difficulty, cls.prep_time, cls.calories, cls.author_id, cls.created_at,
+            cls.likes_count, cls.rating_sum, cls.reviews_count
+        )]
+        if include_author:
+            options.append(joinedload(cls.author_user).load_only(User.username, User.avatar_url, User.avatar_variants))
+        return options
+
+    def to_card_dict(self, include_author=True):
+        """Datos que muestra RecipeCard en los listados"""
+        # Calificación promedio a partir de los contadores
+        reviews_count = self.reviews_count or 0
+        avg_rating = (self.rating_sum or 0) / reviews_count if reviews_count else 0
         
         data = {
             'id': self.id,
             'title': self.title,
-            'description': self.description,
-            'instructions': self.instructions,
             'category': self.category,
             'video_url': self.video_url,
             'main_image_url': self.main_image_url,
+            'card_image_url': variant_url(self.image_variants, 'card') or self.main_image_url,
             'difficulty': self.difficulty,
             'prep_time': self.prep_time,
             'calories': self.calories,
             'author_id': self.author_id,
-            'likes_count': len(self.likes),
+            'likes_count': self.likes_count or 0,
             'avg_rating': round(avg_rating, 1),
-            'reviews_count': len(ratings),
+            'reviews_count': reviews_count,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
         if include_author and self.author_user:
             data['author'] = self.author_user.username
-            data['author_avatar'] = self.author_user.avatar_url
+            data['author_avatar'] = variant_url(self.author_user.avatar_variants, 'thumb') or self.author_user.avatar_url
+        return data
+
+    def to_dict(self, include_author=True, include_ingredients=True):
+        data = self.to_card_dict(include_author=include_author)
+        data['description'] = self.description
+        data['instructions'] = self.instructions
+        data['image_variants'] = self.image_variants
+        data['rating_summary'] = self.rating_summary()
             
         if include_ingredients:
             data['ingredients'] = [i.to_dict() for i in self.ingredients]
@@ -124,6 +269,165 @@ class Recipe(db.Model):
             
         return data
 
+    def rating_summary(self):
+        """Promedio, total e histograma 1-5 a partir de los contadores (las reviews van aparte, paginadas)"""
+        count = self.reviews_count or 0
+        return {
+            'average': round((self.rating_sum or 0) / count, 2) if count else 0,
+            'count': count,
+            'histogram': {str(rating): getattr(self, f'rating_{rating}_count') or 0 for rating in range(1, 6)}
+        }
+
+
+
+class SearchTerm(db.Model):
+    """Índice invertido de búsqueda: término normalizado -> receta (ver search.py)"""
+    __tablename__ = 'search_terms'
+    
+    term = db.Column(db.String(64), primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id', ondelete='CASCADE'), primary_key=True, index=True)
+    weight = db.Column(db.Integer, nullable=False, default=1)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class RecipeChange(db.Model):
+    """
+    Registro de recetas creadas/modificadas/eliminadas. Los índices en memoria
+    de cada worker (pantry.py) lo leen por id para ponerse al día.
+    """
+    __tablename__ = 'recipe_changes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    @classmethod
+    def record(cls, recipe_id):
+        """Anota el cambio en la transacción actual (sin commit)"""
+        db.session.add(cls(recipe_id=recipe_id))
+
+
+class TrendingScore(db.Model):
+    """Puntuación trending con decaimiento exponencial, mantenida por trending.py"""
+    __tablename__ = 'trending_scores'
+    
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float(precision=53), nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_trending_scores_score_recipe', 'score', 'recipe_id'),
+    )
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class TrendingState(db.Model):
+    """Fila única con el punto hasta el que se han procesado eventos y el epoch de las puntuaciones"""
+    __tablename__ = 'trending_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.DateTime, nullable=False)
+    processed_until = db.Column(db.DateTime, nullable=False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class TrendingLike(db.Model):
+    """Likes ya puntuados por trending.py: quitar y volver a dar like no vuelve a sumar"""
+    __tablename__ = 'trending_likes'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id', ondelete='CASCADE'), primary_key=True)
+    scored_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class TrendingReview(db.Model):
+    """Reviews ya puntuadas por trending.py: editarlas vuelve a fecharlas pero no suma otra vez"""
+    __tablename__ = 'trending_reviews'
+    
+    review_id = db.Column(db.Integer, db.ForeignKey('reviews.id', ondelete='CASCADE'), primary_key=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class FeedEntry(db.Model):
+    """Timeline materializado: recetas de los autores seguidos por cada usuario (ver feed.py)"""
+    __tablename__ = 'feed_entries'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id', ondelete='CASCADE'), primary_key=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False)  # copia de recipes.created_at
+    
+    __table_args__ = (
+        db.Index('ix_feed_entries_user_created', 'user_id', 'created_at', 'recipe_id'),
+    )
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class ImageAsset(db.Model):
+    """Cola de imágenes subidas pendientes de generar variantes (ver media.py)"""
+    __tablename__ = 'image_assets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    original_url = db.Column(db.String(255), nullable=False, index=True)
+    status = db.Column(db.Enum('pending', 'processing', 'ready', 'failed'), nullable=False, default='pending', server_default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    claimed_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_image_assets_status_id', 'status', 'id'),
+    )
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class UploadSession(db.Model):
+    """Subida por partes en curso (ver routes/uploads.py); los bytes van a UPLOAD_TMP_DIR"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    kind = db.Column(db.Enum('image', 'video'), nullable=False)
+    filename = db.Column(db.String(255))
+    content_type = db.Column(db.String(100))  # detectado en los primeros bytes
+    size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    # processing: ya están todos los bytes y un worker la pasa al almacenamiento (media.finalize_uploads)
+    status = db.Column(db.Enum('uploading', 'processing', 'complete', 'failed'), nullable=False, default='uploading', server_default='uploading')
+    url = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)  # cuándo la tomó el worker
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'size': self.size,
+            'offset': self.received,
+            'status': self.status,
+            'url': self.url
+        }
 
 
 class RecipeStep(db.Model):
@@ -135,6 +439,7 @@ class RecipeStep(db.Model):
     step_number = db.Column(db.Integer, nullable=False)
     text = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(255))
+    image_variants = db.Column(db.JSON)
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -144,7 +449,8 @@ class RecipeStep(db.Model):
             'id': self.id,
             'step_number': self.step_number,
             'text': self.text,
-            'image_url': self.image_url
+            'image_url': self.image_url,
+            'image_variants': self.image_variants
         }
 
 
@@ -153,7 +459,7 @@ class RecipeIngredient(db.Model):
     __tablename__ = 'recipe_ingredients'
     
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id'), primary_key=True)
-    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id'), primary_key=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id'), primary_key=True, index=True)
     quantity = db.Column(db.Numeric(10, 2))
     
     # Relación con ingrediente
@@ -227,6 +533,7 @@ class MealPlan(db.Model):
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id'), nullable=False)
     plan_date = db.Column(db.Date, nullable=False)
     meal_time = db.Column(db.Enum('Desayuno', 'Comida', 'Cena'), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
     
     # Relaciones
     recipe = db.relationship('Recipe', lazy=True)
@@ -234,6 +541,11 @@ class MealPlan(db.Model):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    @classmethod
+    def eager_options(cls):
+        """Carga la receta planificada con todo lo que serializa to_dict"""
+        return [selectinload(cls.recipe).options(*Recipe.eager_options(include_author=False))]
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -252,6 +564,12 @@ class Follow(db.Model):
     follower_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
     followed_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    
+    # Listas paginadas de seguidores y seguidos (más recientes primero)
+    __table_args__ = (
+        db.Index('ix_follows_followed_created', 'followed_id', 'created_at', 'follower_id'),
+        db.Index('ix_follows_follower_created', 'follower_id', 'created_at', 'followed_id'),
+    )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -267,7 +585,12 @@ class Review(db.Model):
     rating = db.Column(db.SmallInteger)  # 1-5
     comment = db.Column(db.Text)
     image_url = db.Column(db.String(255))
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    image_variants = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
+    
+    __table_args__ = (
+        db.Index('ix_reviews_recipe_created_id', 'recipe_id', 'created_at', 'id'),
+    )
     
     # Relación con usuario
     user = db.relationship('User', lazy=True)
@@ -280,11 +603,12 @@ class Review(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'username': self.user.username if self.user else None,
-            'user_avatar': self.user.avatar_url if self.user else None,
+            'user_avatar': (variant_url(self.user.avatar_variants, 'thumb') or self.user.avatar_url) if self.user else None,
             'recipe_id': self.recipe_id,
             'rating': self.rating,
             'comment': self.comment,
             'image_url': self.image_url,
+            'image_variants': self.image_variants,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -295,13 +619,13 @@ class Like(db.Model):
     
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id'), primary_key=True)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
 
-class RecipeCollection(db.Model):
+class RecipeCollection(Versioned, db.Model):
     """Modelo para colecciones de recetas (Libros)"""
     __tablename__ = 'recipe_collections'
     
@@ -310,14 +634,68 @@ class RecipeCollection(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    # Desnormalizado: se ajusta con cada alta/baja en collection_recipes
+    # (rebuild_counters.py lo recalcula)
+    recipe_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
-    # Relación M:N con recetas a través de una tabla intermedia
-    recipes = db.relationship('Recipe', secondary='collection_recipes', lazy='subquery',
+    # Relación M:N con recetas a través de una tabla intermedia (se carga sólo
+    # al usarla: perfiles y listados usan summaries y el endpoint paginado)
+    recipes = db.relationship('Recipe', secondary='collection_recipes', lazy=True,
         backref=db.backref('collections', lazy=True))
 
+    # Portadas que lleva cada colección en su resumen
+    COVER_COUNT = 4
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    @classmethod
+    def summaries(cls, user_id):
+        """
+        Resumen de las colecciones de un usuario (id, nombre, número de recetas
+        y las primeras portadas) en dos consultas: las colecciones con su
+        contador recipe_count y, para las portadas, un LIMIT por colección sobre
+        la clave primaria de collection_recipes (no se recorren todas las recetas).
+        """
+        rows = db.session.query(cls.id, cls.name, cls.description, cls.recipe_count).filter(cls.user_id == user_id).order_by(cls.id).all()
+
+        covers = {}
+        if rows:
+            latest = [
+                select(collection_recipes.c.collection_id, collection_recipes.c.recipe_id, Recipe.main_image_url, Recipe.image_variants).join(Recipe, Recipe.id == collection_recipes.c.recipe_id).where(collection_recipes.c.collection_id == collection_id, Recipe.main_image_url.isnot(None)).order_by(collection_recipes.c.recipe_id.desc()).limit(cls.COVER_COUNT).subquery()
+                for collection_id, _, _, _ in rows
+            ]
+            cover_rows = db.session.execute(union_all(*[select(*subquery.c) for subquery in latest])).all()
+            for collection_id, _, image_url, variants in sorted(cover_rows, key=lambda row: (row[0], -row[1])):
+                covers.setdefault(collection_id, []).append(variant_url(variants, 'thumb') or image_url)
+
+        return [{
+            'id': collection_id,
+            'name': name,
+            'description': description,
+            'recipe_count': count,
+            'cover_images': covers.get(collection_id, [])
+        } for collection_id, name, description, count in rows]
+
+    @classmethod
+    def discount_recipes(cls, *recipe_ids):
+        """
+        Antes de borrar esas recetas: descuenta de recipe_count (y toca) las
+        colecciones que las contienen, un UPDATE por cada cantidad (sin commit)
+        """
+        if not recipe_ids:
+            return
+        by_removed = {}
+        for collection_id, removed in db.session.query(collection_recipes.c.collection_id, func.count()).filter(collection_recipes.c.recipe_id.in_(recipe_ids)).group_by(collection_recipes.c.collection_id):
+            by_removed.setdefault(removed, []).append(collection_id)
+        for removed, collection_ids in by_removed.items():
+            cls.touch(*collection_ids, values={cls.recipe_count: cls.recipe_count - removed})
+
+    @classmethod
+    def eager_options(cls):
+        """Carga las recetas de la colección con todo lo que serializa to_dict"""
+        return [selectinload(cls.recipes).options(*Recipe.eager_options())]
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -0,0 +1,80 @@
+"""
+Utilidades de paginación por cursor (keyset) para ChefCommunity
+El cursor es opaco para el cliente: JSON con la clave de orden y el id
+del último elemento servido, codificado en base64 url-safe.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no se puede decodificar o no corresponde al orden pedido"""
+
+
+def wants_pagination(args):
+    """Indica si la petición pide respuesta paginada (limit o cursor presentes)"""
+    return 'limit' in args or 'cursor' in args
+
+
+def parse_limit(args, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Lee el parámetro limit acotándolo a [1, maximum]"""
+    try:
+        limit = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def _dump_value(value):
+    if isinstance(value, (list, tuple)):
+        return [_dump_value(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(sort, key, last_id):
+    """Codifica (orden, clave, id) en un token opaco"""
+    payload = {'s': sort, 'k': _dump_value(key), 'id': last_id}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort, key_type=None):
+    """
+    Decodifica un cursor y devuelve (clave, id).
+    key_type convierte la clave serializada al tipo de la columna
+    (datetime.fromisoformat, int, Decimal...).
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload.get('s') != sort:
+            raise InvalidCursor('El cursor pertenece a otro orden')
+        key = payload.get('k')
+        if key is not None and key_type is not None:
+            key = key_type(key)
+        return key, int(payload['id'])
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor(str(e))
+
+
+def keyset_after(key_expr, id_expr, key, last_id):
+    """
+    Condición WHERE para continuar tras (key, last_id) en orden descendente.
+    Se expande a OR/AND en lugar de comparar tuplas para que MySQL use el índice.
+    """
+    if key_expr is None:
+        return id_expr < last_id
+    return or_(key_expr < key, and_(key_expr == key, id_expr < last_id))
@@ -0,0 +1,156 @@
+"""
+Índice en memoria para el modo nevera ("¿qué puedo cocinar?")
+Cada worker mantiene receta -> ids de ingredientes y, al revés, ingrediente ->
+recetas, de modo que las coincidencias y los ingredientes que faltan salen de
+una intersección de conjuntos. Se pone al día leyendo recipe_changes.
+"""
+import threading
+
+from sqlalchemy import func, select
+
+from ingredients import catalog, canonical_name
+from models import db, Ingredient, RecipeIngredient, RecipeChange
+
+# Margen de relectura del registro de cambios: un id bajo puede confirmarse
+# después que uno alto, así que se vuelven a aplicar (son idempotentes)
+CHANGE_LOG_OVERLAP = 100
+
+
+class PantryIndex:
+    """Índice receta <-> ingrediente de un worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = False
+        self._last_change_id = 0
+        self._applied_changes = set()  # ids ya aplicados dentro del margen de relectura
+        self._last_ingredient_id = 0
+        self.recipe_ingredients = {}  # recipe_id -> tuple(ingredient_id) ordenada
+        self.recipe_sets = {}         # recipe_id -> frozenset(ingredient_id)
+        self.postings = {}            # ingredient_id -> set(recipe_id)
+        self.names = {}               # ingredient_id -> nombre en minúsculas
+        self.canonical = {}           # ingredient_id -> nombre canónico
+        self._resolved = {}           # nombre de despensa -> frozenset(ingredient_id)
+
+    def ensure_current(self):
+        """Construye el índice la primera vez y después aplica sólo los cambios nuevos"""
+        with self._lock:
+            if self._ready:
+                self._sync()
+            else:
+                self._build()
+
+    def _build(self):
+        # Se lee el último cambio antes que los datos: lo posterior se reaplica en _sync
+        self._last_change_id = db.session.query(func.max(RecipeChange.id)).scalar() or 0
+        self._load_ingredients()
+
+        grouped = {}
+        rows = db.session.execute(select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id))
+        for recipe_id, ingredient_id in rows:
+            grouped.setdefault(recipe_id, []).append(ingredient_id)
+        for recipe_id, ingredient_ids in grouped.items():
+            self._set_recipe(recipe_id, ingredient_ids)
+        self._ready = True
+
+    def _sync(self):
+        self._load_ingredients()
+        floor = self._last_change_id - CHANGE_LOG_OVERLAP
+        changes = [
+            (change_id, recipe_id) for change_id, recipe_id in db.session.execute(
+                select(RecipeChange.id, RecipeChange.recipe_id).where(RecipeChange.id > floor)
+            ) if change_id not in self._applied_changes
+        ]
+        if not changes:
+            return
+        self.reload_recipes({recipe_id for _, recipe_id in changes})
+        self._applied_changes.update(change_id for change_id, _ in changes)
+        self._last_change_id = max(self._last_change_id, max(change_id for change_id, _ in changes))
+        floor = self._last_change_id - CHANGE_LOG_OVERLAP
+        self._applied_changes = {change_id for change_id in self._applied_changes if change_id > floor}
+
+    def _load_ingredients(self):
+        rows = db.session.execute(
+            select(Ingredient.id, Ingredient.name, Ingredient.canonical_name).where(Ingredient.id > self._last_ingredient_id)
+        ).all()
+        if not rows:
+            return
+        for ingredient_id, name, canonical in rows:
+            self.names[ingredient_id] = name.lower()
+            self.canonical[ingredient_id] = canonical or canonical_name(name)
+            self._last_ingredient_id = max(self._last_ingredient_id, ingredient_id)
+        # Nuevos ingredientes en el catálogo: las resoluciones previas pueden cambiar
+        self._resolved.clear()
+
+    def reload_recipes(self, recipe_ids):
+        """Relee de la base de datos los ingredientes de estas recetas"""
+        grouped = {recipe_id: [] for recipe_id in recipe_ids}
+        rows = db.session.execute(
+            select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id)
+            .where(RecipeIngredient.recipe_id.in_(list(recipe_ids)))
+        )
+        for recipe_id, ingredient_id in rows:
+            grouped[recipe_id].append(ingredient_id)
+        for recipe_id, ingredient_ids in grouped.items():
+            self._set_recipe(recipe_id, ingredient_ids)
+
+    def _set_recipe(self, recipe_id, ingredient_ids):
+        for ingredient_id in self.recipe_ingredients.pop(recipe_id, ()):
+            self.postings.get(ingredient_id, set()).discard(recipe_id)
+        self.recipe_sets.pop(recipe_id, None)
+        if not ingredient_ids:
+            return
+        ordered = tuple(sorted(ingredient_ids))
+        self.recipe_ingredients[recipe_id] = ordered
+        self.recipe_sets[recipe_id] = frozenset(ordered)
+        for ingredient_id in ordered:
+            self.postings.setdefault(ingredient_id, set()).add(recipe_id)
+
+    def resolve(self, pantry_names):
+        """
+        Traduce los nombres de la despensa a ids del catálogo. Se comparan
+        nombres canónicos: un nombre cubre un ingrediente si uno contiene al
+        otro ('tomates' cubre 'tomate cherry') o si es un alias suyo.
+        """
+        catalog.warm()
+        resolved = set()
+        for name in pantry_names:
+            name = canonical_name(name)
+            if not name:
+                continue
+            ids = self._resolved.get(name)
+            if ids is None:
+                ids = frozenset(
+                    ingredient_id for ingredient_id, canonical in self.canonical.items()
+                    if name in canonical or canonical in name
+                )
+                self._resolved[name] = ids
+            resolved |= ids
+            alias_id = catalog.lookup(name)
+            if alias_id:
+                resolved.add(alias_id)
+        return frozenset(resolved)
+
+    def match_count(self, recipe_id, pantry_ids):
+        """Número de ingredientes de la receta cubiertos por la despensa"""
+        return len(self.recipe_sets.get(recipe_id, frozenset()) & pantry_ids)
+
+    def match(self, recipe_id, pantry_ids):
+        """(coincidencias, nombres de ingredientes que faltan) de una receta"""
+        ingredient_ids = self.recipe_ingredients.get(recipe_id, ())
+        missing = [self.names.get(i, '') for i in ingredient_ids if i not in pantry_ids]
+        return len(ingredient_ids) - len(missing), missing
+
+
+pantry_index = PantryIndex()
+
+
+def get_pantry_index():
+    """Índice del worker, al día con el registro de cambios"""
+    pantry_index.ensure_current()
+    return pantry_index
+
+
+def recipes_with_any(ingredient_ids):
+    """Subconsulta de recetas con alguno de estos ingredientes (usa el índice de ingredient_id)"""
+    return select(RecipeIngredient.recipe_id).where(RecipeIngredient.ingredient_id.in_(list(ingredient_ids)))
@@ -0,0 +1,39 @@
+"""
+Genera las variantes redimensionadas de las imágenes subidas y termina las
+subidas por partes ya completas (ver media.py)
+Uso: python process_images.py          (una pasada)
+     python process_images.py --every 5 (en bucle cada 5 segundos)
+"""
+import argparse
+import time
+
+from app import app, db
+from media import process_pending, finalize_uploads
+
+
+def run_once(limit):
+    with app.app_context():
+        try:
+            db.create_all()
+            # Primero las subidas: una imagen terminada encola sus variantes
+            done, failed = finalize_uploads()
+            if done or failed:
+                print(f"✅ {done} subidas por partes terminadas ({failed} con error).")
+            done, failed = process_pending(limit)
+            if done or failed:
+                print(f"✅ Variantes generadas para {done} imágenes ({failed} con error).")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Error procesando imágenes: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--every', type=int, default=0, help='segundos entre pasadas (0 = una sola)')
+    parser.add_argument('--limit', type=int, default=50, help='imágenes por pasada')
+    args = parser.parse_args()
+
+    run_once(args.limit)
+    while args.every > 0:
+        time.sleep(args.every)
+        run_once(args.limit)
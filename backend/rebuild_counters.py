@@ -0,0 +1,61 @@
+"""
+Reconciliación de contadores desnormalizados de recetas y usuarios
+Recalcula likes_count, rating_sum, reviews_count y el histograma rating_N_count desde las tablas likes y reviews,
+followers_count / following_count desde follows y recipe_count de las colecciones desde collection_recipes.
+Uso: python rebuild_counters.py
+"""
+from app import app, db
+from sqlalchemy import func, select
+from models import Recipe, User, Like, Review, Follow, RecipeCollection, collection_recipes
+
+
+def rebuild_recipe_counters():
+    likes = select(func.count()).where(Like.recipe_id == Recipe.id).scalar_subquery()
+    rating_sum = select(func.coalesce(func.sum(Review.rating), 0)).where(Review.recipe_id == Recipe.id).scalar_subquery()
+    reviews = select(func.count(Review.rating)).where(Review.recipe_id == Recipe.id).scalar_subquery()
+
+    values = {
+        Recipe.likes_count: likes,
+        Recipe.rating_sum: rating_sum,
+        Recipe.reviews_count: reviews
+    }
+    for rating in range(1, 6):
+        values[Recipe.rating_column(rating)] = select(func.count()).where(Review.recipe_id == Recipe.id, Review.rating == rating).scalar_subquery()
+
+    updated = Recipe.query.update(values, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+def rebuild_user_counters():
+    followers = select(func.count()).where(Follow.followed_id == User.id).scalar_subquery()
+    following = select(func.count()).where(Follow.follower_id == User.id).scalar_subquery()
+
+    updated = User.query.update({
+        User.followers_count: followers,
+        User.following_count: following
+    }, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+def rebuild_collection_counters():
+    recipes = select(func.count()).where(collection_recipes.c.collection_id == RecipeCollection.id).scalar_subquery()
+
+    updated = RecipeCollection.query.update({RecipeCollection.recipe_count: recipes}, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        try:
+            count = rebuild_recipe_counters()
+            print(f"✅ Contadores recalculados para {count} recetas.")
+            count = rebuild_user_counters()
+            print(f"✅ Contadores recalculados para {count} usuarios.")
+            count = rebuild_collection_counters()
+            print(f"✅ Contadores recalculados para {count} colecciones.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Error recalculando contadores: {e}")
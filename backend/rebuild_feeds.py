@@ -0,0 +1,17 @@
+"""
+Regenera desde cero los timelines del feed de seguidos (tabla feed_entries)
+Uso: python rebuild_feeds.py
+"""
+from app import app, db
+from feed import rebuild_feeds
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        try:
+            db.create_all()
+            count = rebuild_feeds()
+            print(f"✅ Feed regenerado a partir de {count} relaciones de seguimiento.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Error regenerando el feed: {e}")
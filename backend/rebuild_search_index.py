@@ -0,0 +1,17 @@
+"""
+Regenera desde cero el índice de búsqueda de recetas (tabla search_terms)
+Uso: python rebuild_search_index.py
+"""
+from app import app, db
+from search import rebuild_index
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        try:
+            db.create_all()
+            count = rebuild_index()
+            print(f"✅ Índice de búsqueda regenerado para {count} recetas.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Error regenerando el índice de búsqueda: {e}")
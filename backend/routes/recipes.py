@@ -1,33 +1,120 @@
 """
 Blueprint de rutas para recetas
 GET /api/recipes - Lista todas las recetas (con filtros avanzados)
+GET /api/recipes/facets - Recuentos por categoría, dificultad y tiempo para los mismos filtros
 POST /api/recipes - Crea una receta (requiere autenticación)
 GET /api/recipes/<id> - Obtiene una receta específica
 POST /api/recipes/<id>/like - Dar/Quitar like
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
-from sqlalchemy import func, desc
-from datetime import datetime
+from sqlalchemy import func, desc, case, and_, or_, true, delete
 from sqlalchemy.orm import joinedload
-from models import db, Recipe, User, Like, RecipeIngredient, Ingredient, Follow, RecipeStep
+from datetime import datetime
+from decimal import Decimal
+from models import db, insert_ignore, Recipe, User, Like, RecipeIngredient, Ingredient, IngredientAlias, RecipeStep, RecipeChange, RecipeCollection, TrendingScore, collection_recipes
+from ingredients import catalog, canonical_name, parse_ingredient_lines, sum_quantities, resolve_ingredient_ids, update_generic_units
+from pantry import get_pantry_index, recipes_with_any
+from search import search_scores, index_recipe, remove_recipe
+from feed import fan_out_recipes, remove_from_feeds, timeline_recipe_ids, timeline_page
+from listing import parse_projection, project
+from media import save_image, save_upload, completed_upload_url, InvalidUpload
+from cache import cache_anonymous, listing_cache_key, detail_cache_key, invalidate_recipes
+from conditional import conditional, current_viewer
+from pagination import wants_pagination, parse_limit, encode_cursor, decode_cursor, keyset_after, InvalidCursor, DEFAULT_PAGE_SIZE
 
 
 recipes_bp = Blueprint('recipes', __name__)
 
+# Máximo de sugerencias de nevera que acompañan a los resultados
+SUGGESTION_LIMIT = DEFAULT_PAGE_SIZE
+
+# Límites de tiempo de preparación (minutos) de la faceta prep_time
+PREP_TIME_BUCKETS = [15, 30, 60, 120]
+
+
+def _category_condition(category):
+    """Condición del filtro de categoría, o None si no filtra"""
+    if not category or category.lower() == 'todas':
+        return None
+    # Quitamos la 's' final para que "Postres" busque "Postre" y "Ensaladas" busque "Ensalada"
+    search_cat = category.lower().rstrip('s')
+    return func.lower(Recipe.category).like(f'%{search_cat}%')
+
+
+def _difficulty_condition(difficulty):
+    if not difficulty or difficulty.lower() == 'todas':
+        return None
+    return Recipe.difficulty == difficulty
+
+
+def _max_time_condition(max_time):
+    if not max_time:
+        return None
+    return Recipe.prep_time <= int(max_time)
+
+
+def _available_ingredient_names(ingredients):
+    """Ingredientes disponibles: los indicados en la petición más la despensa del usuario"""
+    available_ingredient_names = set()
+    
+    # 1. Obtener de query params (Manual)
+    if ingredients:
+        manual_ings = [i.strip().lower() for i in ingredients.split(',')]
+        available_ingredient_names.update(manual_ings)
+        
+    # 2. Obtener de despensa (Automático)
+    try:
+        verify_jwt_in_request(optional=True)
+        current_user_id = get_jwt_identity()
+        if current_user_id:
+            from models import UserStock
+            user_stock = UserStock.query.filter_by(user_id=current_user_id).all()
+            available_ingredient_names.update([s.ingredient.name.lower() for s in user_stock if s.ingredient])
+    except Exception as e:
+        print(f"Error reading stock: {e}")
+    return available_ingredient_names
+
+
+def _timeline_user_id():
+    """Usuario cuyo timeline se pide con sort=following, o None si es anónimo"""
+    try:
+        verify_jwt_in_request(optional=True)
+        current_user_id = get_jwt_identity()
+        if current_user_id:
+            return int(current_user_id)
+    except Exception as e:
+        print(f"Error reading feed: {e}")
+    return None
+
+
+def _following_condition():
+    """Recetas del timeline del usuario (sort=following), o None si es anónimo"""
+    timeline_user_id = _timeline_user_id()
+    if timeline_user_id is None:
+        return None
+    # Timeline materializado (feed_entries + autores fan-in), sin cargar los seguidos
+    return Recipe.id.in_(timeline_recipe_ids(timeline_user_id))
+
 
 @recipes_bp.route('/', methods=['GET'])
+@cache_anonymous(listing_cache_key)
 def get_recipes():
     """
     Obtiene lista de recetas con filtros avanzados y ordenamiento
     
     Query params:
     - category: filtra por categoría
-    - search: busca en título
+    - search: búsqueda de texto (título, descripción, ingredientes y pasos)
     - author_id: filtra por autor
     - difficulty: filtra por dificultad
     - ingredients: lista separada por comas de ingredientes requeridos
-    - sort: 'newest' (defecto), 'likes', 'following'
+    - sort: 'newest' (defecto), 'relevance' (defecto con search), 'likes', 'rating', 'trending', 'following'
+    - limit: tamaño de página; si se indica (o cursor) la respuesta es
+      {'recipes': [...], 'next_cursor': str|None} en lugar de una lista
+    - cursor: valor de next_cursor de la página anterior (paginación keyset)
+    - view: 'card' devuelve sólo los datos de la tarjeta (sin instrucciones,
+      pasos ni ingredientes); fields=a,b,c recorta a esas claves
     """
     # Obtener parámetros
     category = request.args.get('category')
@@ -37,146 +124,313 @@ def get_recipes():
     ingredients = request.args.get('ingredients')
     fridge = request.args.get('fridge') == 'true'
     max_time = request.args.get('max_time')
-    sort = request.args.get('sort', 'newest')
+    sort = request.args.get('sort') or ('relevance' if search else 'newest')
+    pantry_mode = bool(fridge or ingredients)
+    paginate = wants_pagination(request.args)
+    card_view, fields = parse_projection(request.args)
+    load_options = Recipe.card_options() if card_view else Recipe.eager_options()
     
-    base_query = Recipe.query.options(joinedload(Recipe.ingredients))
+    base_query = Recipe.query
 
     # Filtros básicos (strict)
     if author_id:
         base_query = base_query.filter(Recipe.author_id == int(author_id))
-    if difficulty and difficulty.lower() != 'todas':
-        base_query = base_query.filter(Recipe.difficulty == difficulty)
-    if max_time:
-        base_query = base_query.filter(Recipe.prep_time <= int(max_time))
-        
-    available_ingredient_names = set()
-    
-    # 1. Obtener de query params (Manual)
-    if ingredients:
-        manual_ings = [i.strip().lower() for i in ingredients.split(',')]
-        available_ingredient_names.update(manual_ings)
+    for condition in (_difficulty_condition(difficulty), _max_time_condition(max_time)):
+        if condition is not None:
+            base_query = base_query.filter(condition)
         
-    # 2. Obtener de despensa (Automático)
-    try:
-        verify_jwt_in_request(optional=True)
-        current_user_id = get_jwt_identity()
-        if current_user_id:
-            from models import UserStock
-            user_stock = UserStock.query.filter_by(user_id=current_user_id).all()
-            available_ingredient_names.update([s.ingredient.name.lower() for s in user_stock if s.ingredient])
-    except Exception as e:
-        print(f"Error reading stock: {e}")
+    available_ingredient_names = _available_ingredient_names(ingredients)
 
     primary_query = base_query
+
+    # Con categoría/búsqueda + nevera también se sugieren otras recetas que se pueden
+    # hacer con la nevera: en ese caso las condiciones de primary no filtran, sino que
+    # etiquetan cada candidata como primary o sugerencia en una sola consulta
+    with_suggestions = bool((category or search) and pantry_mode and available_ingredient_names)
+    primary_conditions = []
     
-    if category and category.lower() != 'todas':
-        # Quitamos la 's' final para que "Postres" busque "Postre" y "Ensaladas" busque "Ensalada"
-        search_cat = category.lower().rstrip('s')
-        primary_query = primary_query.filter(func.lower(Recipe.category).like(f'%{search_cat}%'))
-    if search:
-        primary_query = primary_query.filter(func.lower(Recipe.title).like(f'%{search.lower()}%'))
+    category_condition = _category_condition(category)
+    if category_condition is not None:
+        primary_conditions.append(category_condition)
+    search_subquery = search_scores(search) if search else None
+    if search_subquery is not None:
+        if with_suggestions:
+            primary_query = primary_query.outerjoin(search_subquery, Recipe.id == search_subquery.c.recipe_id)
+            primary_conditions.append(search_subquery.c.recipe_id.isnot(None))
+        else:
+            primary_query = primary_query.join(search_subquery, Recipe.id == search_subquery.c.recipe_id)
+    elif search:
+        # Búsqueda sin términos indexables (p.ej. una sola letra)
+        primary_conditions.append(func.lower(Recipe.title).like(f'%{search.lower()}%'))
+
+    # Ingredientes disponibles resueltos a ids del catálogo con el índice en memoria
+    # (la vista card también lo usa para no cargar los ingredientes de cada receta)
+    pantry = None
+    pantry_ids = frozenset()
+    if available_ingredient_names or card_view:
+        pantry = get_pantry_index()
+        pantry_ids = pantry.resolve(available_ingredient_names)
 
     # Filtro inclusivo para primary
-    if fridge or ingredients:
-        if available_ingredient_names:
-            from sqlalchemy import or_
-            filters = [Ingredient.name.ilike(f'%{name}%') for name in available_ingredient_names]
-            primary_query = primary_query.join(RecipeIngredient).join(Ingredient).filter(or_(*filters)).distinct()
+    if pantry_mode and available_ingredient_names:
+        primary_query = primary_query.filter(Recipe.id.in_(recipes_with_any(pantry_ids)))
     
-    # Ordenamiento
+    # Ordenamiento: clave principal + Recipe.id como desempate para que el orden
+    # sea total y el cursor pueda continuar exactamente donde se quedó
+    sort_key = Recipe.created_at
+    key_type = datetime.fromisoformat
+    timeline_user_id = None
     if sort == 'rating':
-        from models import Review
-        rating_subquery = db.session.query(
-            Review.recipe_id,
-            func.avg(Review.rating).label('avg_rating')
-        ).group_by(Review.recipe_id).subquery()
-        primary_query = primary_query.outerjoin(rating_subquery, Recipe.id == rating_subquery.c.recipe_id).order_by(desc('avg_rating'))
+        # Media a partir de los contadores desnormalizados (sin GROUP BY sobre reviews)
+        sort_key = case((Recipe.reviews_count > 0, Recipe.rating_sum * 1.0 / Recipe.reviews_count), else_=0)
+        key_type = Decimal
     elif sort == 'likes':
-        subquery = db.session.query(
-            Like.recipe_id, 
-            func.count('*').label('like_count')
-        ).group_by(Like.recipe_id).subquery()
-        primary_query = primary_query.outerjoin(subquery, Recipe.id == subquery.c.recipe_id).order_by(desc('like_count'))
+        sort_key = Recipe.likes_count
+        key_type = int
+    elif sort == 'trending':
+        # Puntuación precalculada por update_trending.py; las recetas sin fila
+        # (p.ej. antes de la primera pasada) cuentan como 0 y no desaparecen
+        primary_query = primary_query.outerjoin(TrendingScore, TrendingScore.recipe_id == Recipe.id)
+        sort_key = func.coalesce(TrendingScore.score, 0)
+        key_type = float
+    elif sort == 'relevance' and search_subquery is not None:
+        sort_key = search_subquery.c.score
+        key_type = int
     elif sort == 'following':
-        try:
-            verify_jwt_in_request(optional=True)
-            current_user_id = get_jwt_identity()
-            if current_user_id:
-                # Asegurar que el ID sea un entero
-                uid = int(current_user_id)
-                # Obtener IDs de seguidos ÚNICAMENTE
-                followed_ids = [f.followed_id for f in Follow.query.filter_by(follower_id=uid).all()]
-                
-                if not followed_ids:
-                    # Si no sigue a nadie, devolvemos consulta vacía
-                    primary_query = primary_query.filter(Recipe.id == -1)
-                else:
-                    primary_query = primary_query.filter(Recipe.author_id.in_(followed_ids)).order_by(Recipe.created_at.desc())
-            else:
-                primary_query = primary_query.order_by(Recipe.created_at.desc())
-        except:
-            primary_query = primary_query.order_by(Recipe.created_at.desc())
+        if not (author_id or category or search or difficulty or max_time or pantry_mode):
+            # Sin filtros se lee el timeline directamente (ver más abajo)
+            timeline_user_id = _timeline_user_id()
+        else:
+            following_condition = _following_condition()
+            if following_condition is not None:
+                primary_conditions.append(following_condition)
+
+    is_primary = and_(*primary_conditions) if primary_conditions else true()
+    if not with_suggestions:
+        primary_query = primary_query.filter(is_primary)
+    primary_query = primary_query.order_by(sort_key.desc(), Recipe.id.desc())
+
+    next_cursor = None
+    limit = parse_limit(request.args) if paginate else None
+    cursor = request.args.get('cursor') if paginate else None
 
-    primary_results = primary_query.all()
-    
-    # Sugerencias AI: si buscaron algo escrito/categoría + nevera, sugerimos otras que se pueden hacer con su nevera
     suggestions_results = []
-    if (category or search) and (fridge or ingredients) and available_ingredient_names:
-        primary_ids = [r.id for r in primary_results]
-        from sqlalchemy import or_
-        sugg_filters = [Ingredient.name.ilike(f'%{name}%') for name in available_ingredient_names]
-        suggestion_query = base_query.join(RecipeIngredient).join(Ingredient).filter(or_(*sugg_filters)).distinct()
-        if primary_ids:
-            suggestion_query = suggestion_query.filter(~Recipe.id.in_(primary_ids))
-        suggestions_results = suggestion_query.all()
+    if pantry_mode:
+        # Ranking por coincidencias: se ordenan en memoria sólo (id, clave, etiqueta)
+        # de los candidatos y se cargan completas únicamente las recetas a devolver
+        ranked = []
+        suggested = []
+        for recipe_id, key, primary in primary_query.with_entities(Recipe.id, sort_key, case((is_primary, 1), else_=0)).all():
+            matched = pantry.match_count(recipe_id, pantry_ids) if pantry else 0
+            if primary:
+                ranked.append((matched, key, recipe_id))
+            else:
+                suggested.append((matched, recipe_id))
+        ranked.sort(reverse=True)
+        if cursor:
+            try:
+                cursor_key, cursor_id = decode_cursor(cursor, f'pantry:{sort}', lambda k: (int(k[0]), key_type(k[1])))
+            except InvalidCursor:
+                return jsonify({'error': 'Cursor inválido'}), 400
+            after = (cursor_key[0], cursor_key[1], cursor_id)
+            ranked = [entry for entry in ranked if entry < after]
+        if paginate:
+            if len(ranked) > limit:
+                matched, key, last_id = ranked[limit - 1]
+                next_cursor = encode_cursor(f'pantry:{sort}', [matched, key], last_id)
+            ranked = ranked[:limit]
 
-    def process_and_sort(results, is_suggestion=False):
-        def is_matched(recipe_name, avail_names):
-            for avail in avail_names:
-                if avail in recipe_name or recipe_name in avail:
-                    return True
-            return False
+        # Las sugerencias (las mejores por coincidencias) van tras la última página
+        suggestion_ids = []
+        if suggested and next_cursor is None:
+            suggested.sort(reverse=True)
+            suggestion_ids = [recipe_id for _, recipe_id in suggested[:SUGGESTION_LIMIT]]
+
+        if paginate:
+            page_ids = [recipe_id for _, _, recipe_id in ranked]
+            loaded = Recipe.query.options(*load_options).filter(Recipe.id.in_(page_ids + suggestion_ids)).all()
+        else:
+            loaded = primary_query.options(*load_options).filter(or_(is_primary, Recipe.id.in_(suggestion_ids))).all()
+        by_id = {r.id: r for r in loaded}
+        primary_results = [by_id[recipe_id] for _, _, recipe_id in ranked if recipe_id in by_id]
+        suggestions_results = [by_id[recipe_id] for recipe_id in suggestion_ids if recipe_id in by_id]
+    elif timeline_user_id is not None:
+        # Timeline: keyset sobre feed_entries (created_at, recipe_id) más los autores
+        # fan-in, y sólo se cargan las recetas de la página
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, sort, key_type)
+            except InvalidCursor:
+                return jsonify({'error': 'Cursor inválido'}), 400
+        entries = timeline_page(timeline_user_id, limit, after)
+        if paginate and len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(sort, *entries[-1])
+        page_ids = [recipe_id for _, recipe_id in entries]
+        by_id = {r.id: r for r in Recipe.query.options(*load_options).filter(Recipe.id.in_(page_ids)).all()} if page_ids else {}
+        primary_results = [by_id[recipe_id] for recipe_id in page_ids if recipe_id in by_id]
+    else:
+        # Paginación keyset sobre el orden SQL
+        if cursor:
+            try:
+                cursor_key, cursor_id = decode_cursor(cursor, sort, key_type)
+            except InvalidCursor:
+                return jsonify({'error': 'Cursor inválido'}), 400
+            primary_query = primary_query.filter(keyset_after(sort_key, Recipe.id, cursor_key, cursor_id))
 
+        rows_query = primary_query.options(*load_options).add_columns(sort_key.label('sort_key'))
+        if paginate:
+            rows = rows_query.limit(limit + 1).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last_recipe, last_key = rows[-1]
+                next_cursor = encode_cursor(sort, last_key, last_recipe.id)
+        else:
+            rows = rows_query.all()
+        primary_results = [recipe for recipe, _ in rows]
+    
+    def process_and_sort(results, is_suggestion=False):
         processed = []
         unique_results = list({r.id: r for r in results}.values())
         for r in unique_results:
-            data = r.to_dict()
-            recipe_ing_names = [ri.ingredient.name.lower() for ri in r.ingredients if ri.ingredient]
-            missing = [name for name in recipe_ing_names if not is_matched(name, available_ingredient_names)]
+            data = r.to_card_dict() if card_view else r.to_dict()
+            if pantry:
+                # Coincidencias y faltantes por intersección con el índice
+                matching_count, missing = pantry.match(r.id, pantry_ids)
+            else:
+                missing = [ri.ingredient.name.lower() for ri in r.ingredients if ri.ingredient]
+                matching_count = 0
             
             data['missing_ingredients'] = missing
             data['is_complete'] = len(missing) == 0
             data['is_suggestion'] = is_suggestion
             
-            matching_count = len(recipe_ing_names) - len(missing)
             data['_matching_count'] = matching_count
             
             processed.append(data)
             
-        if fridge or ingredients:
+        if pantry_mode:
             processed.sort(key=lambda x: x['_matching_count'], reverse=True)
             
         for d in processed:
             d.pop('_matching_count', None)
             
-        return processed
+        return [project(d, fields) for d in processed]
 
     primary_list = process_and_sort(primary_results, is_suggestion=False)
     suggestion_list = process_and_sort(suggestions_results, is_suggestion=True)
 
+    if paginate:
+        return jsonify({'recipes': primary_list + suggestion_list, 'next_cursor': next_cursor})
     return jsonify(primary_list + suggestion_list)
 
 
+@recipes_bp.route('/facets', methods=['GET'])
+@cache_anonymous(listing_cache_key)
+def get_recipe_facets():
+    """
+    Recuentos por categoría, dificultad y tiempo de preparación para el
+    contexto actual, con los mismos parámetros y filtros que GET /api/recipes.
+    Cada faceta ignora su propio filtro (muestra cuántas habría al cambiarlo).
+    Una sola consulta agregada: se agrupa por (categoría, dificultad, tramo de
+    tiempo, cumple cada filtro de faceta) y se reparte en Python.
+    """
+    category = request.args.get('category')
+    search = request.args.get('search')
+    author_id = request.args.get('author_id')
+    ingredients = request.args.get('ingredients')
+    fridge = request.args.get('fridge') == 'true'
+    pantry_mode = bool(fridge or ingredients)
+
+    query = db.session.query(Recipe)
+    if author_id:
+        query = query.filter(Recipe.author_id == int(author_id))
+    search_subquery = search_scores(search) if search else None
+    if search_subquery is not None:
+        query = query.join(search_subquery, Recipe.id == search_subquery.c.recipe_id)
+    elif search:
+        query = query.filter(func.lower(Recipe.title).like(f'%{search.lower()}%'))
+    if pantry_mode:
+        available_ingredient_names = _available_ingredient_names(ingredients)
+        if available_ingredient_names:
+            pantry_ids = get_pantry_index().resolve(available_ingredient_names)
+            query = query.filter(Recipe.id.in_(recipes_with_any(pantry_ids)))
+    if request.args.get('sort') == 'following':
+        following_condition = _following_condition()
+        if following_condition is not None:
+            query = query.filter(following_condition)
+
+    try:
+        facet_conditions = {
+            'category': _category_condition(category),
+            'difficulty': _difficulty_condition(request.args.get('difficulty')),
+            'prep_time': _max_time_condition(request.args.get('max_time')),
+        }
+    except ValueError:
+        return jsonify({'error': 'max_time debe ser un número'}), 400
+    active = [name for name, condition in facet_conditions.items() if condition is not None]
+
+    bucket = case(*[(Recipe.prep_time <= bound, bound) for bound in PREP_TIME_BUCKETS], else_=None)
+    flags = [case((facet_conditions[name], 1), else_=0) for name in active]
+    group = [Recipe.category, Recipe.difficulty, bucket] + flags
+    rows = query.with_entities(*group, func.count(Recipe.id)).group_by(*group).all()
+
+    def passes(row, skip):
+        # Cumple todos los filtros de faceta salvo el de la propia faceta
+        return all(row[3 + i] for i, name in enumerate(active) if name != skip)
+
+    counts = {'category': {}, 'difficulty': {}}
+    time_rows = []
+    total = 0
+    for row in rows:
+        count = row[-1]
+        if passes(row, None):
+            total += count
+        for name, value in (('category', row[0]), ('difficulty', row[1])):
+            if passes(row, name):
+                counts[name][value] = counts[name].get(value, 0) + count
+        if passes(row, 'prep_time'):
+            time_rows.append((row[2], count))
+
+    def as_list(values):
+        return [{'value': value, 'count': count} for value, count in sorted(values.items(), key=lambda item: (-item[1], str(item[0])))]
+
+    # Acumulado: lo que devolvería max_time=<límite> (None = sin límite)
+    prep_time = [
+        {'max_time': bound, 'count': sum(count for b, count in time_rows if b is not None and b <= bound)}
+        for bound in PREP_TIME_BUCKETS
+    ]
+    prep_time.append({'max_time': None, 'count': sum(count for _, count in time_rows)})
+
+    return jsonify({
+        'total': total,
+        'category': as_list(counts['category']),
+        'difficulty': as_list(counts['difficulty']),
+        'prep_time': prep_time
+    })
+
+
+def _recipe_version(recipe_id):
+    """Revisión de la receta por clave primaria; is_liked depende de quién la pide"""
+    row = db.session.query(Recipe.revision, Recipe.updated_at).filter_by(id=recipe_id).first()
+    if row is None:
+        return None
+    return ('recipe', recipe_id, row.revision, current_viewer()), row.updated_at
+
+
 @recipes_bp.route('/<int:recipe_id>', methods=['GET'])
+@conditional(_recipe_version)
+@cache_anonymous(detail_cache_key)
 @jwt_required(optional=True)
 def get_recipe(recipe_id):
     """Obtiene una receta específica por ID"""
     recipe = Recipe.query.get_or_404(recipe_id)
     current_user_id = get_jwt_identity()
     
+    # Las reviews no van en el detalle: rating_summary resume los contadores
+    # y se piden paginadas a /<id>/reviews
     recipe_data = recipe.to_dict()
-    recipe_data['reviews'] = [r.to_dict() for r in recipe.reviews]
-
     
     is_liked = False
     if current_user_id:
@@ -189,13 +443,122 @@ def get_recipe(recipe_id):
     return jsonify(recipe_data)
 
 
+@recipes_bp.route('/<int:recipe_id>/reviews', methods=['GET'])
+@conditional(_recipe_version)
+@cache_anonymous(detail_cache_key)
+@jwt_required(optional=True)
+def get_reviews(recipe_id):
+    """
+    Reviews de una receta, más recientes primero, paginadas por cursor
+    (?limit=&cursor=). Los autores se cargan en la misma consulta.
+    """
+    from models import Review
+    if not db.session.query(Recipe.id).filter_by(id=recipe_id).first():
+        return jsonify({'error': 'Receta no encontrada'}), 404
+
+    limit = parse_limit(request.args)
+    query = Review.query.filter(Review.recipe_id == recipe_id).options(joinedload(Review.user).load_only(User.username, User.avatar_url, User.avatar_variants))
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_key, cursor_id = decode_cursor(cursor, 'reviews', datetime.fromisoformat)
+        except InvalidCursor:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        query = query.filter(keyset_after(Review.created_at, Review.id, cursor_key, cursor_id))
+
+    reviews = query.order_by(Review.created_at.desc(), Review.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = encode_cursor('reviews', reviews[-1].created_at, reviews[-1].id)
+    return jsonify({'reviews': [r.to_dict() for r in reviews], 'next_cursor': next_cursor})
+
+
+def _json_list(value):
+    """Listas que llegan como texto JSON (form-data) o ya decodificadas (JSON)"""
+    if isinstance(value, str):
+        import json
+        return json.loads(value)
+    return value
+
+
+def _ingredient_quantities(ingredients_list):
+    """
+    Resuelve en bloque las líneas de ingredientes contra el catálogo.
+    Devuelve ({ingredient_id: cantidad}, {ingredient_id: unidad}).
+    """
+    lines = parse_ingredient_lines(ingredients_list)
+    ingredient_ids = resolve_ingredient_ids([name for name, _, _ in lines])
+    return sum_quantities(lines, ingredient_ids)
+
+
+def _add_recipe_ingredients(recipe_id, ingredients_list):
+    """Enlaza los ingredientes a la receta resolviéndolos en bloque contra el catálogo"""
+    quantities, units = _ingredient_quantities(ingredients_list)
+    for ingredient_id, qty_val in quantities.items():
+        db.session.add(RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id, quantity=qty_val))
+
+    # Si el ingrediente tiene unidad genérica se adopta la de la receta
+    update_generic_units(units)
+
+
+def _sync_recipe_ingredients(recipe_id, ingredients_list):
+    """Aplica sólo las altas, bajas y cambios de cantidad respecto a lo guardado (sin commit)"""
+    quantities, units = _ingredient_quantities(ingredients_list)
+    existing = {ri.ingredient_id: ri for ri in RecipeIngredient.query.filter_by(recipe_id=recipe_id)}
+
+    removed = [ingredient_id for ingredient_id in existing if ingredient_id not in quantities]
+    if removed:
+        RecipeIngredient.query.filter(RecipeIngredient.recipe_id == recipe_id, RecipeIngredient.ingredient_id.in_(removed)).delete(synchronize_session=False)
+    for ingredient_id, qty_val in quantities.items():
+        current = existing.get(ingredient_id)
+        if current is None:
+            db.session.add(RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id, quantity=qty_val))
+        elif current.quantity is None or round(float(current.quantity), 2) != round(qty_val, 2):
+            current.quantity = qty_val
+
+    update_generic_units(units)
+
+
+def _sync_recipe_steps(recipe_id, new_steps):
+    """
+    Aplica los pasos nuevos sobre los guardados conservando sus ids: cada paso
+    se empareja por id si lo trae y si no por número de paso; sólo se escriben
+    los que cambian y se borran los que sobran (sin commit).
+    """
+    existing = RecipeStep.query.filter_by(recipe_id=recipe_id).all()
+    by_id = {step.id: step for step in existing}
+    matched = {}
+    for position, step_data in enumerate(new_steps):
+        step = by_id.pop(step_data.get('id'), None) if step_data.get('id') else None
+        if step is not None:
+            matched[position] = step
+    by_number = {step.step_number: step for step in by_id.values()}
+    for position, step_data in enumerate(new_steps):
+        if position not in matched and step_data['step_number'] in by_number:
+            matched[position] = by_number.pop(step_data['step_number'])
+
+    for position, step_data in enumerate(new_steps):
+        step = matched.get(position)
+        if step is None:
+            db.session.add(RecipeStep(recipe_id=recipe_id, step_number=step_data['step_number'], text=step_data['text'], image_url=step_data['image_url']))
+            continue
+        if step.image_url != step_data['image_url']:
+            step.image_variants = None
+        for field in ('step_number', 'text', 'image_url'):
+            if getattr(step, field) != step_data[field]:
+                setattr(step, field, step_data[field])
+
+    used = {step.id for step in matched.values()}
+    removed = [step.id for step in existing if step.id not in used]
+    if removed:
+        RecipeStep.query.filter(RecipeStep.id.in_(removed)).delete(synchronize_session=False)
+
+
 @recipes_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_recipe():
     """Crea una nueva receta con soporte para imágenes y videos"""
-    import os
-    from werkzeug.utils import secure_filename
-    from flask import current_app
     import sys
 
     print("DEBUG: create_recipe endpoint hit", file=sys.stderr, flush=True)
@@ -226,24 +589,21 @@ def create_recipe():
         main_image_url = data.get('main_image_url')
         video_url = data.get('video_url')
         
-        # Ensure uploads directory exists
-        upload_folder = os.path.join(current_app.root_path, 'static', 'uploads')
-        os.makedirs(upload_folder, exist_ok=True)
-
+        # Se guardan por contenido; las variantes de las imágenes las genera process_images.py
         if 'main_image' in files:
             file = files['main_image']
             if file and file.filename:
-                filename = secure_filename(f"{current_user_id}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-                file.save(os.path.join(upload_folder, filename))
-                main_image_url = f"/static/uploads/{filename}"
+                main_image_url = save_image(file)
+        elif data.get('main_image_upload_id'):
+            main_image_url = completed_upload_url(data['main_image_upload_id'], current_user_id, 'image')
 
+        # Los vídeos grandes llegan antes por /api/uploads y aquí sólo su id
         if 'video' in files:
             file = files['video']
             if file and file.filename:
-                # Basic validation for video could go here
-                filename = secure_filename(f"vid_{current_user_id}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-                file.save(os.path.join(upload_folder, filename))
-                video_url = f"/static/uploads/{filename}"
+                video_url = save_upload(file, 'video')
+        elif data.get('video_upload_id'):
+            video_url = completed_upload_url(data['video_upload_id'], current_user_id, 'video')
         
         new_recipe = Recipe(
             title=data['title'],
@@ -263,67 +623,13 @@ def create_recipe():
 
         # Process Ingredients
         import json
-        from models import Ingredient, RecipeIngredient
         
         ingredients_json = data.get('ingredients')
         if ingredients_json:
             try:
                 ingredients_list = json.loads(ingredients_json)
                 print(f"DEBUG: Ingredients parsed: {ingredients_list}", file=sys.stderr, flush=True)
-                
-                for ing_data in ingredients_list:
-                    name = ing_data.get('name', '').strip()
-                    qty_str = ing_data.get('quantity', '0')
-                    
-                    if not name:
-                        continue
-                        
-                    # Find or create ingredient (Master table)
-                    ingredient = Ingredient.query.filter_by(name=name).first()
-                    if not ingredient:
-                        ingredient = Ingredient(name=name, unit='ud') # Default unit Spanish
-                        db.session.add(ingredient)
-                        db.session.flush()
-                        
-                    # Clean quantity string to number if possible, or store as is? 
-                    # Model expects Numeric(10,2). We need to extract number.
-                    # Simple regex for now or just force float
-                    import re
-                    # Extract number and unit
-                    # Looks for number at start, then optional space and unit
-                    match = re.search(r"^([-+]?\d*\.?\d+)\s*([a-zA-ZñÑ]*)$", qty_str.strip())
-                    
-                    if match:
-                        qty_val = float(match.group(1))
-                        unit_str = match.group(2).lower() if match.group(2) else 'ud'
-                    else:
-                         # Fallback for just number
-                        qty_match = re.search(r"[-+]?\d*\.\d+|\d+", qty_str)
-                        qty_val = float(qty_match.group()) if qty_match else 0
-                        unit_str = 'ud'
-
-                    # Clean unit strings (optional normalization)
-                    if unit_str in ['g', 'gr', 'gramos']: unit_str = 'g'
-                    if unit_str in ['kg', 'kilos']: unit_str = 'kg'
-                    if unit_str in ['ml', 'mililitros']: unit_str = 'ml'
-                    if unit_str in ['l', 'litros']: unit_str = 'L'
-                    
-                    # Link to Recipe
-                    recipe_ing = RecipeIngredient(
-                        recipe_id=new_recipe.id,
-                        ingredient_id=ingredient.id,
-                        quantity=qty_val
-                    )
-                    db.session.add(recipe_ing)
-                    
-                    # Update or Set Unit on Ingredient
-                    # WARNING: Simple valid logic - if ingredient has generic unit, update it.
-                    # If it has specific unit, we trust the DB (limitation: no conversion)
-                    if ingredient.unit == 'unit' or ingredient.unit == 'ud':
-                        ingredient.unit = unit_str
-                        db.session.add(ingredient) # Mark for update
-                    db.session.add(recipe_ing)
-                    
+                _add_recipe_ingredients(new_recipe.id, ingredients_list)
             except Exception as e:
                 print(f"ERROR processing ingredients: {e}", file=sys.stderr, flush=True)
 
@@ -343,9 +649,7 @@ def create_recipe():
                     if file_key in files:
                         file = files[file_key]
                         if file and file.filename:
-                            filename = secure_filename(f"step_{new_recipe.id}_{i}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-                            file.save(os.path.join(upload_folder, filename))
-                            step_image_url = f"/static/uploads/{filename}"
+                            step_image_url = save_image(file)
                     
                     new_step = RecipeStep(
                         recipe_id=new_recipe.id,
@@ -354,15 +658,25 @@ def create_recipe():
                         image_url=step_image_url
                     )
                     db.session.add(new_step)
+            except InvalidUpload:
+                raise
             except Exception as e:
                 print(f"ERROR processing steps: {e}", file=sys.stderr, flush=True)
         
+        # Índice de búsqueda y registro de cambios en la misma transacción que la receta
+        index_recipe(new_recipe)
+        RecipeChange.record(new_recipe.id)
+        fan_out_recipes(new_recipe.id)
         db.session.commit()
+        invalidate_recipes(new_recipe.id)
         
         # Return full recipe including ingredients
         recipe_data = new_recipe.to_dict()
         recipe_data['ingredients'] = [ri.to_dict() for ri in new_recipe.ingredients]
         return jsonify(recipe_data), 201
+    except InvalidUpload as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         import traceback
@@ -370,6 +684,38 @@ def create_recipe():
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
+@recipes_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_recipes_ndjson():
+    """
+    Importación masiva (Solo Admin). Cuerpo NDJSON con una receta por línea;
+    se lee y se responde en streaming: una línea de resultado por receta y al
+    final {'summary': {'created', 'failed'}}. Las recetas sin author_id se
+    asignan al admin que importa.
+    """
+    import json
+    from flask import current_app, Response, stream_with_context
+    from importer import import_recipes
+
+    current_user_id = get_jwt_identity()
+    current_user = User.query.get(current_user_id)
+
+    if not current_user or current_user.rol != 'admin':
+        return jsonify({'error': 'No autorizado'}), 403
+
+    request.max_content_length = current_app.config.get('IMPORT_MAX_CONTENT_LENGTH')
+    author_id = current_user.id
+
+    def generate():
+        counts = {'created': 0, 'failed': 0}
+        for result in import_recipes(request.stream, author_id):
+            counts['created' if result['status'] == 'created' else 'failed'] += 1
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+        yield json.dumps({'summary': counts}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @recipes_bp.route('/<int:recipe_id>', methods=['PUT'])
 @jwt_required()
 def update_recipe(recipe_id):
@@ -404,114 +750,37 @@ def update_recipe(recipe_id):
             setattr(recipe, field, data[field])
             
     # Handle File Uploads in Update
-    import os
-    from werkzeug.utils import secure_filename
-    from flask import current_app
-    from datetime import datetime
+    import sys
 
-    upload_folder = os.path.join(current_app.root_path, 'static', 'uploads')
-    os.makedirs(upload_folder, exist_ok=True)
+    # Ingredientes y pasos: sólo se aplican las diferencias con las filas
+    # actuales, y todo (campos incluidos) se confirma en una única transacción
+    try:
+        main_image_url = None
+        if 'main_image' in files:
+            file = files['main_image']
+            if file and file.filename:
+                main_image_url = save_image(file)
+        elif data.get('main_image_upload_id'):
+            main_image_url = completed_upload_url(data['main_image_upload_id'], current_user_id, 'image')
+        if main_image_url and main_image_url != recipe.main_image_url:
+            recipe.main_image_url = main_image_url
+            recipe.image_variants = None
 
-    if 'main_image' in files:
-        file = files['main_image']
-        if file and file.filename:
-            filename = secure_filename(f"upd_{current_user_id}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-            file.save(os.path.join(upload_folder, filename))
-            recipe.main_image_url = f"/static/uploads/{filename}"
+        if 'video' in files:
+            file = files['video']
+            if file and file.filename:
+                recipe.video_url = save_upload(file, 'video')
+        elif data.get('video_upload_id'):
+            recipe.video_url = completed_upload_url(data['video_upload_id'], current_user_id, 'video')
 
-    if 'video' in files:
-        file = files['video']
-        if file and file.filename:
-            filename = secure_filename(f"upd_vid_{current_user_id}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-            file.save(os.path.join(upload_folder, filename))
-            recipe.video_url = f"/static/uploads/{filename}"
-    
-    db.session.commit()
-    
-    # Update Ingredients if provided
-    if 'ingredients' in data:
-        try:
-            import json
-            from models import Ingredient, RecipeIngredient
-            import sys
-            
-            # Clear existing ingredients
-            RecipeIngredient.query.filter_by(recipe_id=recipe.id).delete()
-            
-            ingredients_json = data['ingredients']
-            # If it comes as string (form-data style) or list (json style)
-            if isinstance(ingredients_json, str):
-                ingredients_list = json.loads(ingredients_json)
-            else:
-                ingredients_list = ingredients_json
-                
+        if 'ingredients' in data:
+            ingredients_list = _json_list(data['ingredients'])
             print(f"DEBUG: Updating ingredients: {ingredients_list}", file=sys.stderr, flush=True)
+            _sync_recipe_ingredients(recipe.id, ingredients_list)
 
-            for ing_data in ingredients_list:
-                name = ing_data.get('name', '').strip()
-                qty_str = str(ing_data.get('quantity', '0'))
-                
-                if not name:
-                    continue
-                    
-                # Find or create ingredient (Master table)
-                ingredient = Ingredient.query.filter_by(name=name).first()
-                if not ingredient:
-                    ingredient = Ingredient(name=name, unit='ud')
-                    db.session.add(ingredient)
-                    db.session.flush()
-                    
-                # Parse quantity loop (reuse logic from create or simplified)
-                import re
-                match = re.search(r"^([-+]?\d*\.?\d+)\s*([a-zA-ZñÑ]*)$", qty_str.strip())
-                
-                if match:
-                    qty_val = float(match.group(1))
-                    unit_str = match.group(2).lower() if match.group(2) else 'ud'
-                else:
-                    qty_match = re.search(r"[-+]?\d*\.\d+|\d+", qty_str)
-                    qty_val = float(qty_match.group()) if qty_match else 0
-                    unit_str = 'ud'
-
-                # Clean unit strings
-                if unit_str in ['g', 'gr', 'gramos']: unit_str = 'g'
-                if unit_str in ['kg', 'kilos']: unit_str = 'kg'
-                if unit_str in ['ml', 'mililitros']: unit_str = 'ml'
-                if unit_str in ['l', 'litros']: unit_str = 'L'
-                if unit_str in ['oz', 'ounce', 'ounces']: unit_str = 'oz'
-                if unit_str in ['lb', 'pound', 'pounds']: unit_str = 'lb'
-                
-                # Link to Recipe
-                recipe_ing = RecipeIngredient(
-                    recipe_id=recipe.id,
-                    ingredient_id=ingredient.id,
-                    quantity=qty_val
-                )
-                db.session.add(recipe_ing)
-                
-                # Update unit if generic
-                if ingredient.unit == 'unit' or ingredient.unit == 'ud':
-                    ingredient.unit = unit_str
-                    db.session.add(ingredient)
-
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            print(f"ERROR updating ingredients: {e}", file=sys.stderr, flush=True)
-            return jsonify({'error': str(e)}), 500
-
-    # Update Steps if provided
-    if 'steps' in data:
-        try:
-            # Clear existing steps
-            RecipeStep.query.filter_by(recipe_id=recipe.id).delete()
-            
-            steps_json = data['steps']
-            if isinstance(steps_json, str):
-                steps_list = json.loads(steps_json)
-            else:
-                steps_list = steps_json
-            
+        if 'steps' in data:
+            steps_list = _json_list(data['steps'])
+            new_steps = []
             for i, step_data in enumerate(steps_list):
                 step_text = step_data.get('text', '').strip()
                 if not step_text:
@@ -524,23 +793,24 @@ def update_recipe(recipe_id):
                 if file_key in files:
                     file = files[file_key]
                     if file and file.filename:
-                        filename = secure_filename(f"step_{recipe.id}_{i}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-                        file.save(os.path.join(upload_folder, filename))
-                        step_image_url = f"/static/uploads/{filename}"
+                        step_image_url = save_image(file)
                 
-                new_step = RecipeStep(
-                    recipe_id=recipe.id,
-                    step_number=i + 1,
-                    text=step_text,
-                    image_url=step_image_url
-                )
-                db.session.add(new_step)
-            
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            print(f"ERROR updating steps: {e}", file=sys.stderr, flush=True)
-            return jsonify({'error': str(e)}), 500
+                new_steps.append({'id': step_data.get('id'), 'step_number': i + 1, 'text': step_text, 'image_url': step_image_url})
+            _sync_recipe_steps(recipe.id, new_steps)
+
+        # Reindexar para la búsqueda y avisar a los índices en memoria
+        index_recipe(recipe)
+        RecipeChange.record(recipe.id)
+        Recipe.touch(recipe.id)
+        db.session.commit()
+    except InvalidUpload as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        print(f"ERROR updating recipe: {e}", file=sys.stderr, flush=True)
+        return jsonify({'error': str(e)}), 500
+    invalidate_recipes(recipe.id)
 
     # Return full recipe including ingredients
     recipe_data = recipe.to_dict()
@@ -569,8 +839,15 @@ def delete_recipe(recipe_id):
     if recipe.author_id != user_id_int and not is_admin:
         return jsonify({'error': 'No autorizado'}), 403
     
+    remove_recipe(recipe.id)
+    remove_from_feeds(recipe.id)
+    RecipeChange.record(recipe.id)
+    # Desaparece del perfil del autor y de las colecciones que la contenían
+    User.touch(recipe.author_id)
+    RecipeCollection.discount_recipes(recipe.id)
     db.session.delete(recipe)
     db.session.commit()
+    invalidate_recipes(recipe_id)
     return jsonify({'message': 'Receta eliminada'})
 
 
@@ -586,15 +863,19 @@ def toggle_like(recipe_id):
     if existing_like:
         db.session.delete(existing_like)
         action = 'unliked'
+        delta = -1
     else:
         new_like = Like(user_id=current_user_id, recipe_id=recipe_id)
         db.session.add(new_like)
         action = 'liked'
+        delta = 1
+    
+    # Actualización atómica del contador (y la revisión) en la misma transacción (UPDATE ... SET x = x + 1)
+    Recipe.touch(recipe_id, values={Recipe.likes_count: Recipe.likes_count + delta})
+    likes_count = db.session.query(Recipe.likes_count).filter_by(id=recipe_id).scalar()
         
     db.session.commit()
-    
-    # Recalcular total
-    likes_count = Like.query.filter_by(recipe_id=recipe_id).count()
+    invalidate_recipes(recipe_id)
     
     return jsonify({
         'action': action,
@@ -602,13 +883,53 @@ def toggle_like(recipe_id):
     })
 
 
+def _set_like(recipe_id, liked):
+    """
+    Like idempotente: un único INSERT IGNORE o DELETE, y el contador sólo se
+    mueve si cambió una fila, así dos toques simultáneos no chocan ni cuentan doble.
+    """
+    user_id = int(get_jwt_identity())
+    if liked:
+        result = db.session.execute(insert_ignore(Like).values(user_id=user_id, recipe_id=recipe_id))
+    else:
+        result = db.session.execute(delete(Like).where(Like.user_id == user_id, Like.recipe_id == recipe_id))
+    changed = result.rowcount == 1
+    if changed:
+        Recipe.touch(recipe_id, values={Recipe.likes_count: Recipe.likes_count + (1 if liked else -1)})
+
+    likes_count = db.session.query(Recipe.likes_count).filter_by(id=recipe_id).scalar()
+    if likes_count is None:
+        db.session.rollback()
+        return jsonify({'error': 'Receta no encontrada'}), 404
+    db.session.commit()
+    if changed:
+        invalidate_recipes(recipe_id)
+
+    return jsonify({
+        'action': 'liked' if liked else 'unliked',
+        'changed': changed,
+        'likes_count': likes_count
+    })
+
+
+@recipes_bp.route('/<int:recipe_id>/like', methods=['PUT'])
+@jwt_required()
+def like_recipe(recipe_id):
+    """Da like a una receta (repetirlo no cambia nada)"""
+    return _set_like(recipe_id, True)
+
+
+@recipes_bp.route('/<int:recipe_id>/like', methods=['DELETE'])
+@jwt_required()
+def unlike_recipe(recipe_id):
+    """Quita el like de una receta (repetirlo no cambia nada)"""
+    return _set_like(recipe_id, False)
+
+
 @recipes_bp.route('/<int:recipe_id>/reviews', methods=['POST'])
 @jwt_required()
 def add_review(recipe_id):
     """Añade o actualiza una valoración y comentario con soporte para imágenes"""
-    import os
-    from werkzeug.utils import secure_filename
-    from flask import current_app
     
     current_user_id = get_jwt_identity()
     
@@ -633,20 +954,29 @@ def add_review(recipe_id):
     if 'image' in files:
         file = files['image']
         if file and file.filename:
-            upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'reviews')
-            os.makedirs(upload_folder, exist_ok=True)
-            filename = secure_filename(f"rev_{recipe_id}_{current_user_id}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-            file.save(os.path.join(upload_folder, filename))
-            image_url = f"/static/uploads/reviews/{filename}"
+            try:
+                image_url = save_image(file)
+            except InvalidUpload as e:
+                return jsonify({'error': str(e)}), e.status
 
     # Buscar si ya existe una review de este usuario para esta receta
     from models import Review
     review = Review.query.filter_by(user_id=current_user_id, recipe_id=recipe_id).first()
     
+    counters = {}
     if review:
+        rating_delta = int(rating) - (review.rating or 0)
+        count_delta = 0 if review.rating else 1
+        # Cambio de valoración: la review pasa de una barra del histograma a otra
+        if review.rating != int(rating):
+            if review.rating:
+                counters[Recipe.rating_column(review.rating)] = Recipe.rating_column(review.rating) - 1
+            counters[Recipe.rating_column(rating)] = Recipe.rating_column(rating) + 1
         review.rating = int(rating)
         review.comment = comment
-        if image_url: review.image_url = image_url
+        if image_url and image_url != review.image_url:
+            review.image_url = image_url
+            review.image_variants = None
         review.created_at = datetime.utcnow()
     else:
         review = Review(
@@ -657,6 +987,46 @@ def add_review(recipe_id):
             image_url=image_url
         )
         db.session.add(review)
+        rating_delta = int(rating)
+        count_delta = 1
+        counters[Recipe.rating_column(rating)] = Recipe.rating_column(rating) + 1
+    
+    # Contadores de valoración actualizados de forma atómica junto a la review
+    Recipe.touch(recipe_id, values={
+        Recipe.rating_sum: Recipe.rating_sum + rating_delta,
+        Recipe.reviews_count: Recipe.reviews_count + count_delta,
+        **counters
+    })
         
     db.session.commit()
+    invalidate_recipes(recipe_id)
     return jsonify(review.to_dict()), 201
+
+
+@recipes_bp.route('/ingredients/aliases', methods=['GET', 'POST'])
+@jwt_required()
+def manage_ingredient_aliases():
+    """Lista o registra sinónimos de ingredientes (Solo Admin)"""
+    current_user_id = get_jwt_identity()
+    current_user = User.query.get(current_user_id)
+    
+    if not current_user or current_user.rol != 'admin':
+        return jsonify({'error': 'No autorizado'}), 403
+        
+    if request.method == 'GET':
+        aliases = IngredientAlias.query.order_by(IngredientAlias.alias).all()
+        return jsonify([a.to_dict() for a in aliases])
+        
+    data = request.get_json()
+    alias = canonical_name(data.get('alias', ''))
+    ingredient = Ingredient.query.get(data.get('ingredient_id'))
+    
+    if not alias or not ingredient:
+        return jsonify({'error': 'Alias e ingrediente son requeridos'}), 400
+    if Ingredient.query.filter_by(canonical_name=alias).first():
+        return jsonify({'error': 'Ya existe un ingrediente con ese nombre; fusiónalos con canonicalize_ingredients.py'}), 409
+        
+    entry = db.session.merge(IngredientAlias(alias=alias, ingredient_id=ingredient.id))
+    db.session.commit()
+    catalog.remember({alias: ingredient.id})
+    return jsonify(entry.to_dict()), 201
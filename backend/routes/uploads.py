@@ -0,0 +1,186 @@
+"""
+Blueprints de archivos subidos
+uploads_bp sirve /static/uploads/* del almacenamiento local con Range/If-Range
+(para saltar en los vídeos), ETag y Cache-Control inmutable en las claves con
+hash. Con MEDIA_OFFLOAD='x-accel' o 'x-sendfile' sólo se generan las cabeceras
+y nginx/Apache envían los bytes sin ocupar un worker de gunicorn.
+
+upload_sessions_bp (/api/uploads) recibe vídeos e imágenes grandes por partes
+reanudables: cada PUT trae un trozo en bruto con Content-Range que se copia
+por bloques al archivo parcial, sin multipart ni spool previo. El formato se
+comprueba con el primer trozo y el tamaño al abrir la subida, así que un
+archivo no válido se rechaza antes de enviar el resto. Con el último trozo la
+subida queda 'processing' y el worker (media.finalize_uploads) calcula el hash
+y la mueve al almacenamiento; el cliente consulta GET hasta ver 'complete'.
+"""
+import mimetypes
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.http import parse_content_range_header
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+from media import InvalidUpload, SNIFF_BYTES, check_size, check_content, partial_upload_path
+from models import db, UploadSession
+from storage import storage, LocalStorage, CHUNK_SIZE
+
+uploads_bp = Blueprint('uploads', __name__)
+upload_sessions_bp = Blueprint('upload_sessions', __name__)
+
+# Las subidas (y sus partes) se borran pasado este tiempo
+UPLOAD_EXPIRY = timedelta(days=1)
+
+# Claves por contenido (storage.save) y sus variantes (media.py): nunca cambian
+CONTENT_ADDRESSED = re.compile(r'^(?:[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}|variants/[0-9a-f]{64}_\w+)\.\w+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+@uploads_bp.route('/<path:key>', methods=['GET', 'HEAD'])
+def serve_upload(key):
+    """Envía un archivo subido; con S3 las URLs ya apuntan al bucket y aquí no hay nada"""
+    if not isinstance(storage.backend, LocalStorage):
+        abort(404)
+    # Los temporales y las subidas a medias (.partial) viven bajo la misma raíz
+    if any(part.startswith('.') for part in key.split('/')):
+        abort(404)
+    path = safe_join(storage.backend.root, key)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    immutable = CONTENT_ADDRESSED.match(key) is not None
+    # El hash sirve de ETag igual en todos los nodos (el de werkzeug depende del mtime)
+    etag = os.path.splitext(key.rsplit('/', 1)[-1])[0] if immutable else True
+    max_age = IMMUTABLE_MAX_AGE if immutable else current_app.config.get('MEDIA_MAX_AGE', 3600)
+    offload = current_app.config.get('MEDIA_OFFLOAD')
+
+    if offload == 'x-accel':
+        # nginx resuelve la ruta interna y atiende él mismo Range e If-Range
+        response = current_app.response_class(mimetype=mimetypes.guess_type(key)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = current_app.config.get('MEDIA_ACCEL_PREFIX', '/_uploads/').rstrip('/') + '/' + key
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    else:
+        response = send_file(
+            path, request.environ, conditional=True, etag=etag, max_age=max_age,
+            use_x_sendfile=offload == 'x-sendfile', response_class=current_app.response_class
+        )
+
+    response.cache_control.immutable = immutable
+    return response
+
+
+def _purge_expired(limit=20):
+    """Borra algunas subidas caducadas y sus partes (se llama al abrir otra)"""
+    expired = UploadSession.query.filter(UploadSession.created_at < datetime.utcnow() - UPLOAD_EXPIRY).limit(limit).all()
+    for session in expired:
+        path = partial_upload_path(session.id)
+        if os.path.exists(path):
+            os.remove(path)
+        db.session.delete(session)
+
+
+def _own_session(upload_id):
+    session = db.session.get(UploadSession, upload_id)
+    if session is None or str(session.user_id) != str(get_jwt_identity()):
+        abort(404)
+    return session
+
+
+@upload_sessions_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_upload():
+    """Abre una subida por partes: {kind: 'video'|'image', size, filename}"""
+    data = request.get_json() or {}
+    kind = data.get('kind')
+    if kind not in ('image', 'video'):
+        return jsonify({'error': "kind debe ser 'image' o 'video'"}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size es requerido'}), 400
+    if size <= 0:
+        return jsonify({'error': 'size es requerido'}), 400
+    try:
+        check_size(kind, size)
+    except InvalidUpload as e:
+        return jsonify({'error': str(e)}), e.status
+
+    _purge_expired()
+    session = UploadSession(id=uuid.uuid4().hex, user_id=get_jwt_identity(), kind=kind, size=size, filename=(data.get('filename') or '')[:255])
+    db.session.add(session)
+    db.session.commit()
+    result = session.to_dict()
+    result['chunk_size'] = current_app.config['UPLOAD_CHUNK_SIZE']
+    return jsonify(result), 201
+
+
+@upload_sessions_bp.route('/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    """Estado de la subida; offset indica desde dónde reanudar"""
+    return jsonify(_own_session(upload_id).to_dict())
+
+
+@upload_sessions_bp.route('/<upload_id>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id):
+    """
+    Recibe el trozo indicado por Content-Range (bytes inicio-fin/total) como
+    cuerpo en bruto. Debe empezar en el offset actual (si no, 409 con el offset
+    correcto). Tras el último trozo responde 202 con status 'processing';
+    la url aparece en GET cuando el worker termina.
+    """
+    session = _own_session(upload_id)
+    if session.status != 'uploading':
+        return jsonify(session.to_dict()), {'complete': 200, 'processing': 202}.get(session.status, 410)
+
+    content_range = parse_content_range_header(request.headers.get('Content-Range'))
+    if content_range is None or content_range.units != 'bytes' or content_range.length != session.size or content_range.start is None:
+        return jsonify({'error': f'Content-Range debe ser bytes inicio-fin/{session.size}'}), 400
+    start, stop = content_range.start, content_range.stop
+    if start != session.received:
+        return jsonify({'error': 'El trozo no empieza en el offset actual', **session.to_dict()}), 409
+    if stop - start > current_app.config['UPLOAD_CHUNK_SIZE']:
+        return jsonify({'error': f"Trozo mayor que {current_app.config['UPLOAD_CHUNK_SIZE']} bytes"}), 413
+    if request.content_length is not None and request.content_length != stop - start:
+        return jsonify({'error': 'Content-Length no coincide con el Content-Range'}), 400
+    request.max_content_length = current_app.config['UPLOAD_CHUNK_SIZE']
+
+    path = partial_upload_path(session.id)
+    remaining = stop - start
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as partial:
+        # Descarta lo que dejara escrito un trozo interrumpido
+        partial.seek(start)
+        partial.truncate()
+        first = start == 0
+        while remaining > 0:
+            block = request.stream.read(min(CHUNK_SIZE, remaining))
+            if not block:
+                break
+            if first:
+                first = False
+                try:
+                    session.content_type = check_content(session.kind, block[:SNIFF_BYTES])
+                except InvalidUpload as e:
+                    session.status = 'failed'
+                    db.session.commit()
+                    partial.close()
+                    os.remove(path)
+                    return jsonify({'error': str(e)}), e.status
+            partial.write(block)
+            remaining -= len(block)
+        if remaining:
+            partial.truncate(start)
+            return jsonify({'error': 'Cuerpo más corto que el Content-Range', **session.to_dict()}), 400
+
+    session.received = stop
+    if session.received == session.size:
+        # Hash y paso al almacenamiento fuera de la petición (media.finalize_uploads)
+        session.status = 'processing'
+    db.session.commit()
+    return jsonify(session.to_dict()), 202 if session.status == 'processing' else 200
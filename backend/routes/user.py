@@ -2,13 +2,92 @@
 Blueprint de usuarios
 Perfil, Seguidores, Plan Semanal, Colecciones
 """
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, Recipe, Follow, Like, RecipeCollection, MealPlan, ShoppingList, RecipeIngredient, UserStock, collection_recipes
+from sqlalchemy import func, select, delete, or_
+from sqlalchemy.orm import load_only
+from cache import invalidate_recipes
+from conditional import conditional, current_viewer
+from feed import backfill_follow, prune_follow, refresh_fan_in
+from listing import parse_projection, project
+from media import save_image, InvalidUpload
+from models import db, insert_ignore, User, Recipe, Follow, Like, Review, RecipeCollection, MealPlan, ShoppingList, RecipeIngredient, UserStock, collection_recipes
+from pagination import wants_pagination, parse_limit, encode_cursor, decode_cursor, keyset_after, InvalidCursor
 
 user_bp = Blueprint('users', __name__)
 
+
+def _recipes_showing_user(user_id):
+    """Ids de las recetas en las que aparece el nombre/avatar del usuario (suyas o valoradas)"""
+    authored = db.session.query(Recipe.id).filter(Recipe.author_id == user_id)
+    reviewed = db.session.query(Review.recipe_id).filter(Review.user_id == user_id)
+    return [recipe_id for recipe_id, in authored.union(reviewed)]
+
+
+def _revisions(model, *criteria):
+    """Suma de revisiones y última modificación de unas filas, como subconsultas escalares"""
+    return (
+        select(func.coalesce(func.sum(model.revision), 0)).where(*criteria).scalar_subquery(),
+        select(func.max(model.updated_at)).where(*criteria).scalar_subquery(),
+    )
+
+
+def _collections_version(user_id, with_recipes):
+    """
+    Revisión de un usuario y sus colecciones en una sola consulta. Las sumas sólo
+    crecen salvo al borrar, y los borrados incrementan la revisión del usuario
+    (o de la colección), así que dos estados distintos nunca comparten versión.
+    """
+    member_ids = select(collection_recipes.c.recipe_id).join(RecipeCollection, RecipeCollection.id == collection_recipes.c.collection_id).where(RecipeCollection.user_id == user_id)
+    columns = [User.revision, User.updated_at]
+    if with_recipes:
+        columns += _revisions(Recipe, Recipe.author_id == user_id)
+    columns += _revisions(RecipeCollection, RecipeCollection.user_id == user_id)
+    columns += _revisions(Recipe, Recipe.id.in_(member_ids))
+    row = db.session.execute(select(*columns).where(User.id == user_id)).first()
+    if row is None:
+        return None
+    dates = [d for d in row[1::2] if d is not None]
+    return tuple(row[0::2]), max(dates) if dates else None
+
+
+def _profile_version(user_id):
+    version = _collections_version(user_id, with_recipes=True)
+    if version is None:
+        return None
+    revisions, last_modified = version
+    return ('profile', user_id, revisions, current_viewer()), last_modified
+
+
+def _my_collections_version():
+    user_id = current_viewer()
+    if request.method != 'GET' or not user_id:
+        return None
+    version = _collections_version(user_id, with_recipes=False)
+    if version is None:
+        return None
+    revisions, last_modified = version
+    return ('collections', user_id, revisions), last_modified
+
+
+def _meal_plan_version():
+    """
+    Altas y bajas cambian (número, id máximo); las recetas, la suma de sus
+    revisiones. Sin Last-Modified: un borrado no deja fecha.
+    """
+    user_id = current_viewer()
+    if request.method != 'GET' or not user_id:
+        return None
+    row = db.session.execute(
+        select(func.count(MealPlan.id), func.max(MealPlan.id), func.coalesce(func.sum(Recipe.revision), 0))
+        .join(Recipe, Recipe.id == MealPlan.recipe_id).where(MealPlan.user_id == user_id)
+    ).first()
+    return ('meal-plan', user_id, tuple(row)), None
+
+
 @user_bp.route('/<int:user_id>', methods=['GET'])
+@conditional(_profile_version)
 @jwt_required(optional=True)
 def get_profile(user_id):
     """Obtiene perfil público de usuario con sus recetas"""
@@ -22,14 +101,18 @@ def get_profile(user_id):
              if follow:
                  is_following = True
 
-        # Obtener recetas publicadas
-        recipes = Recipe.query.filter_by(author_id=user_id).order_by(Recipe.created_at.desc()).all()
+        # Obtener recetas publicadas (?view=card / ?fields= para la proyección ligera)
+        card_view, fields = parse_projection(request.args)
+        load_options = Recipe.card_options(include_author=False) if card_view else Recipe.eager_options(include_author=False)
+        recipes = Recipe.query.filter_by(author_id=user_id).options(*load_options).order_by(Recipe.created_at.desc()).all()
+        serialize = Recipe.to_card_dict if card_view else Recipe.to_dict
         
         return jsonify({
             'user': user.to_dict(),
             'is_following': is_following,
-            'recipes': [r.to_dict(include_author=False) for r in recipes],
-            'collections': [c.to_dict() for c in user.collections]
+            'recipes': [project(serialize(r, include_author=False), fields) for r in recipes],
+            # Sólo resúmenes: las recetas de cada colección se piden paginadas
+            'collections': RecipeCollection.summaries(user_id)
         })
     except Exception as e:
         import traceback
@@ -37,26 +120,139 @@ def get_profile(user_id):
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
+# Órdenes del listado de administración (todos descendentes)
+ADMIN_USER_SORTS = ('newest', 'recipes', 'followers', 'likes')
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ['id', 'username', 'email', 'rol', 'created_at', 'recipes_count', 'likes_received', 'followers_count', 'following_count']
+
+
+def _admin_users_query():
+    """
+    Usuarios con sus recetas y likes recibidos, sacados de un único GROUP BY
+    sobre recipes (los seguidores ya son columnas de users). Devuelve la
+    consulta y las expresiones de los dos agregados.
+    """
+    stats = select(
+        Recipe.author_id,
+        func.count(Recipe.id).label('recipes_count'),
+        func.sum(Recipe.likes_count).label('likes_received')
+    ).group_by(Recipe.author_id).subquery()
+    recipes_count = func.coalesce(stats.c.recipes_count, 0)
+    likes_received = func.coalesce(stats.c.likes_received, 0)
+    query = db.session.query(User, recipes_count.label('recipes_count'), likes_received.label('likes_received')).outerjoin(stats, stats.c.author_id == User.id)
+    return query, recipes_count, likes_received
+
+
+def _require_admin():
+    current_user = User.query.get(get_jwt_identity())
+    if not current_user or current_user.rol != 'admin':
+        return jsonify({'error': 'No autorizado'}), 403
+    return None
+
+
 @user_bp.route('/all/', methods=['GET'])
 @jwt_required()
 def get_all_users():
-    """Obtiene todos los usuarios (Solo Admin)"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-    
-    if not current_user or current_user.rol != 'admin':
-        return jsonify({'error': 'No autorizado'}), 403
-        
-    users = User.query.all()
+    """
+    Usuarios para el panel de administración (Solo Admin).
+    - search: texto en nombre o email
+    - rol: filtra por rol
+    - sort: 'newest' (defecto), 'recipes', 'followers', 'likes' (recibidos)
+    - limit / cursor: paginación por cursor; respuesta {'users', 'next_cursor'}
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    sort = request.args.get('sort', 'newest')
+    if sort not in ADMIN_USER_SORTS:
+        return jsonify({'error': f"sort debe ser uno de: {', '.join(ADMIN_USER_SORTS)}"}), 400
+
+    query, recipes_count, likes_received = _admin_users_query()
+    search = request.args.get('search', '').strip()
+    if search:
+        query = query.filter(or_(User.username.contains(search, autoescape=True), User.email.contains(search, autoescape=True)))
+    if request.args.get('rol'):
+        query = query.filter(User.rol == request.args['rol'])
+
+    sort_key = {'newest': User.created_at, 'recipes': recipes_count, 'followers': User.followers_count, 'likes': likes_received}[sort]
+    key_type = datetime.fromisoformat if sort == 'newest' else int
+    query = query.add_columns(sort_key.label('sort_key')).order_by(sort_key.desc(), User.id.desc())
+
+    paginate = wants_pagination(request.args)
+    next_cursor = None
+    if paginate:
+        limit = parse_limit(request.args)
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_key, cursor_id = decode_cursor(cursor, f'admin-users:{sort}', key_type)
+            except InvalidCursor:
+                return jsonify({'error': 'Cursor inválido'}), 400
+            query = query.filter(keyset_after(sort_key, User.id, cursor_key, cursor_id))
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_user, _, _, last_key = rows[-1]
+            next_cursor = encode_cursor(f'admin-users:{sort}', last_key, last_user.id)
+    else:
+        rows = query.all()
+
     users_data = []
-    for user in users:
+    for user, user_recipes, user_likes, _ in rows:
         u_dict = user.to_dict()
-        u_dict['recipes_count'] = len(user.recipes)
+        u_dict['recipes_count'] = int(user_recipes)
+        u_dict['likes_received'] = int(user_likes)
         users_data.append(u_dict)
-        
+
+    if paginate:
+        return jsonify({'users': users_data, 'next_cursor': next_cursor})
     return jsonify(users_data)
 
 
+@user_bp.route('/all/export', methods=['GET'])
+@jwt_required()
+def export_users():
+    """
+    Exporta todos los usuarios en CSV (Solo Admin). Se genera en streaming por
+    lotes de EXPORT_BATCH_SIZE ordenados por id, sin cargar la tabla entera.
+    """
+    import csv
+    import io
+    from flask import Response, stream_with_context
+
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        last_id = 0
+        while True:
+            query, _, _ = _admin_users_query()
+            rows = query.filter(User.id > last_id).order_by(User.id).limit(EXPORT_BATCH_SIZE).all()
+            for user, user_recipes, user_likes in rows:
+                writer.writerow([
+                    user.id, user.username, user.email, user.rol,
+                    user.created_at.isoformat() if user.created_at else '',
+                    int(user_recipes), int(user_likes), user.followers_count or 0, user.following_count or 0
+                ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if len(rows) < EXPORT_BATCH_SIZE:
+                break
+            last_id = rows[-1][0].id
+            # Libera los objetos del lote ya escrito
+            db.session.expunge_all()
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=usuarios.csv'
+    return response
+
+
 @user_bp.route('/<int:target_user_id>/', methods=['DELETE', 'PUT'])
 @jwt_required()
 def manage_user_admin(target_user_id):
@@ -72,8 +268,21 @@ def manage_user_admin(target_user_id):
     if request.method == 'DELETE':
         if str(current_user_id) == str(target_user_id):
             return jsonify({'error': 'No puedes eliminarte a ti mismo'}), 400
+        # Los likes del usuario se borran en cascada: descontarlos de las recetas
+        liked_ids = [recipe_id for recipe_id, in db.session.query(Like.recipe_id).filter(Like.user_id == target_user_id)]
+        Recipe.touch(*liked_ids, values={Recipe.likes_count: Recipe.likes_count - 1})
+        # Igual con sus follows, borrados en bloque para no cargar la relación entera
+        followed_ids = [user_id for user_id, in db.session.query(Follow.followed_id).filter(Follow.follower_id == target_user_id)]
+        follower_ids = [user_id for user_id, in db.session.query(Follow.follower_id).filter(Follow.followed_id == target_user_id)]
+        User.touch(*followed_ids, values={User.followers_count: User.followers_count - 1})
+        User.touch(*follower_ids, values={User.following_count: User.following_count - 1})
+        Follow.query.filter(or_(Follow.follower_id == target_user_id, Follow.followed_id == target_user_id)).delete(synchronize_session=False)
+        affected_ids = liked_ids + _recipes_showing_user(target_user_id)
+        # Sus recetas se borran en cascada: salen de las colecciones de otros
+        RecipeCollection.discount_recipes(*[recipe_id for recipe_id, in db.session.query(Recipe.id).filter(Recipe.author_id == target_user_id)])
         db.session.delete(user_to_manage)
         db.session.commit()
+        invalidate_recipes(*affected_ids)
         return jsonify({'message': 'Usuario eliminado exitosamente'})
         
     if request.method == 'PUT':
@@ -94,7 +303,10 @@ def manage_user_admin(target_user_id):
         if 'username' in data:
             user_to_manage.username = data['username']
             
+        shown_in = _recipes_showing_user(target_user_id)
+        Recipe.touch(*shown_in)
         db.session.commit()
+        invalidate_recipes(*shown_in)
         return jsonify({'message': 'Usuario actualizado correctamente', 'user': user_to_manage.to_dict()})
 
 
@@ -104,24 +316,22 @@ def manage_user_admin(target_user_id):
 def get_liked_recipes():
     """Obtener recetas que le gustan al usuario actual"""
     current_user_id = get_jwt_identity()
+    card_view, fields = parse_projection(request.args)
+    load_options = Recipe.card_options() if card_view else Recipe.eager_options()
+    serialize = Recipe.to_card_dict if card_view else Recipe.to_dict
     
-    # Usamos un join implícito o iteramos. 
-    # Dado que Like tiene backref='recipe' en Recipe, Like objects tienen .recipe
-    likes = Like.query.filter_by(user_id=current_user_id).order_by(Like.created_at.desc()).all()
-    
-    recipes_data = []
-    for like in likes:
-        if like.recipe:
-            recipes_data.append(like.recipe.to_dict(include_author=True))
+    # Join con likes para conservar el orden (más recientes primero) y
+    # cargar las relaciones de todas las recetas de una vez
+    recipes = Recipe.query.join(Like, Like.recipe_id == Recipe.id).filter(Like.user_id == current_user_id).options(*load_options).order_by(Like.created_at.desc()).all()
             
-    return jsonify(recipes_data)
+    return jsonify([project(serialize(r, include_author=True), fields) for r in recipes])
 
 
 @user_bp.route('/<int:user_id>/follow', methods=['POST'])
 @jwt_required()
 def follow_user(user_id):
     """Seguir o dejar de seguir a un usuario"""
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     if current_user_id == user_id:
         return jsonify({'error': 'No puedes seguirte a ti mismo'}), 400
         
@@ -129,24 +339,128 @@ def follow_user(user_id):
     
     if follow:
         db.session.delete(follow)
+        prune_follow(current_user_id, user_id)
+        _count_follow(current_user_id, user_id, -1)
         action = 'unfollowed'
     else:
         new_follow = Follow(follower_id=current_user_id, followed_id=user_id)
         db.session.add(new_follow)
+        db.session.flush()
+        _count_follow(current_user_id, user_id, 1)
+        refresh_fan_in(user_id)
+        backfill_follow(current_user_id, user_id)
         action = 'followed'
         
     db.session.commit()
     return jsonify({'action': action, 'user_id': user_id})
 
 
+def _count_follow(follower_id, followed_id, delta):
+    """Contadores de seguidos/seguidores de ambos perfiles (y su revisión), sin commit"""
+    User.touch(follower_id, values={User.following_count: User.following_count + delta})
+    User.touch(followed_id, values={User.followers_count: User.followers_count + delta})
+
+
+def _set_follow(user_id, following):
+    """
+    Seguimiento idempotente con un único INSERT IGNORE o DELETE; el timeline y
+    las revisiones sólo se tocan si cambió la fila.
+    """
+    current_user_id = int(get_jwt_identity())
+    if current_user_id == user_id:
+        return jsonify({'error': 'No puedes seguirte a ti mismo'}), 400
+    if db.session.get(User, user_id) is None:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
+
+    if following:
+        result = db.session.execute(insert_ignore(Follow).values(follower_id=current_user_id, followed_id=user_id))
+    else:
+        result = db.session.execute(delete(Follow).where(Follow.follower_id == current_user_id, Follow.followed_id == user_id))
+    changed = result.rowcount == 1
+    if changed:
+        _count_follow(current_user_id, user_id, 1 if following else -1)
+
+    if changed and following:
+        followers_count = refresh_fan_in(user_id)
+        backfill_follow(current_user_id, user_id)
+    else:
+        if changed:
+            prune_follow(current_user_id, user_id)
+        followers_count = db.session.query(User.followers_count).filter(User.id == user_id).scalar()
+    db.session.commit()
+
+    return jsonify({
+        'action': 'followed' if following else 'unfollowed',
+        'changed': changed,
+        'user_id': user_id,
+        'followers_count': followers_count
+    })
+
+
+@user_bp.route('/<int:user_id>/follow', methods=['PUT'])
+@jwt_required()
+def follow(user_id):
+    """Seguir a un usuario (repetirlo no cambia nada)"""
+    return _set_follow(user_id, True)
+
+
+@user_bp.route('/<int:user_id>/follow', methods=['DELETE'])
+@jwt_required()
+def unfollow(user_id):
+    """Dejar de seguir a un usuario (repetirlo no cambia nada)"""
+    return _set_follow(user_id, False)
+
+
+def _follow_list(user_id, match_column, other_column):
+    """
+    Página de usuarios de una relación de seguimiento, más recientes primero
+    (?limit=&cursor=). Recorre el índice (usuario, created_at, otro usuario)
+    sin contar ni cargar el resto de filas.
+    """
+    if db.session.get(User, user_id) is None:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
+
+    sort = f'follows:{match_column.key}'
+    limit = parse_limit(request.args)
+    query = db.session.query(User, Follow.created_at).join(Follow, User.id == other_column).filter(match_column == user_id).options(load_only(User.username, User.rol, User.avatar_url, User.avatar_variants, User.followers_count))
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_key, cursor_id = decode_cursor(cursor, sort, datetime.fromisoformat)
+        except InvalidCursor:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        query = query.filter(keyset_after(Follow.created_at, other_column, cursor_key, cursor_id))
+
+    rows = query.order_by(Follow.created_at.desc(), other_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_user, last_created = rows[-1]
+        next_cursor = encode_cursor(sort, last_created, last_user.id)
+    return jsonify({'users': [user.to_summary_dict() for user, _ in rows], 'next_cursor': next_cursor})
+
+
+@user_bp.route('/<int:user_id>/followers', methods=['GET'])
+def get_followers(user_id):
+    """Usuarios que siguen a user_id"""
+    return _follow_list(user_id, Follow.followed_id, Follow.follower_id)
+
+
+@user_bp.route('/<int:user_id>/following', methods=['GET'])
+def get_following(user_id):
+    """Usuarios a los que sigue user_id"""
+    return _follow_list(user_id, Follow.follower_id, Follow.followed_id)
+
+
 @user_bp.route('/me/meal-plan', methods=['GET', 'POST'])
+@conditional(_meal_plan_version)
 @jwt_required()
 def manage_meal_plan():
     """Gestionar planificador semanal"""
     current_user_id = get_jwt_identity()
     
     if request.method == 'GET':
-        plans = MealPlan.query.filter_by(user_id=current_user_id).order_by(MealPlan.plan_date).all()
+        plans = MealPlan.query.filter_by(user_id=current_user_id).options(*MealPlan.eager_options()).order_by(MealPlan.plan_date).all()
         return jsonify([p.to_dict() for p in plans])
         
     if request.method == 'POST':
@@ -175,14 +489,14 @@ def delete_meal_plan_item(plan_id):
 
 
 @user_bp.route('/me/collections', methods=['GET', 'POST'])
+@conditional(_my_collections_version)
 @jwt_required()
 def manage_collections():
     """Gestionar libros de recetas"""
     current_user_id = get_jwt_identity()
     
     if request.method == 'GET':
-        collections = RecipeCollection.query.filter_by(user_id=current_user_id).all()
-        return jsonify([c.to_dict() for c in collections])
+        return jsonify(RecipeCollection.summaries(current_user_id))
         
     if request.method == 'POST':
         data = request.get_json()
@@ -196,34 +510,126 @@ def manage_collections():
         return jsonify(new_collection.to_dict()), 201
 
 
+def _collection_recipes_version(user_id, collection_id):
+    version = _collections_version(user_id, with_recipes=False)
+    if version is None:
+        return None
+    revisions, last_modified = version
+    return ('collection-recipes', user_id, collection_id, revisions), last_modified
+
+
+@user_bp.route('/<int:user_id>/collections/<int:collection_id>/recipes', methods=['GET'])
+@conditional(_collection_recipes_version)
+def get_collection_recipes(user_id, collection_id):
+    """
+    Recetas de una colección por id de receta descendente (las más recientes
+    primero, no por fecha en que se añadieron), paginadas por cursor (?limit=&cursor=) sobre la clave primaria de
+    collection_recipes. Admite ?view=card / ?fields= como los listados.
+    """
+    collection = RecipeCollection.query.filter_by(id=collection_id, user_id=user_id).first_or_404()
+    card_view, fields = parse_projection(request.args)
+    load_options = Recipe.card_options() if card_view else Recipe.eager_options()
+    serialize = Recipe.to_card_dict if card_view else Recipe.to_dict
+
+    limit = parse_limit(request.args)
+    query = Recipe.query.join(collection_recipes, collection_recipes.c.recipe_id == Recipe.id).filter(collection_recipes.c.collection_id == collection.id).options(*load_options)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            _, cursor_id = decode_cursor(cursor, 'collection')
+        except InvalidCursor:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        query = query.filter(keyset_after(None, collection_recipes.c.recipe_id, None, cursor_id))
+
+    recipes = query.order_by(collection_recipes.c.recipe_id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(recipes) > limit:
+        recipes = recipes[:limit]
+        next_cursor = encode_cursor('collection', None, recipes[-1].id)
+    return jsonify({'recipes': [project(serialize(r, include_author=True), fields) for r in recipes], 'next_cursor': next_cursor})
+
+
+# Máximo de recetas por petición en las altas/bajas en bloque
+COLLECTION_BULK_LIMIT = 1000
+
+
+def _change_membership(collection_id, recipe_ids, adding):
+    """
+    Altas o bajas en collection_recipes con consultas por clave primaria
+    (collection_id, recipe_id), sin cargar la colección. recipe_count se
+    ajusta con las filas que tocó el INSERT IGNORE / DELETE. Devuelve sólo lo
+    que cambió y el nuevo número de recetas.
+    """
+    current_user_id = get_jwt_identity()
+    collection = RecipeCollection.query.filter_by(id=collection_id, user_id=current_user_id).first_or_404()
+    recipe_ids = set(recipe_ids)
+
+    members = {recipe_id for recipe_id, in db.session.query(collection_recipes.c.recipe_id).filter(collection_recipes.c.collection_id == collection.id, collection_recipes.c.recipe_id.in_(recipe_ids))} if recipe_ids else set()
+    if adding:
+        existing = {recipe_id for recipe_id, in db.session.query(Recipe.id).filter(Recipe.id.in_(recipe_ids - members))} if recipe_ids - members else set()
+        changed = sorted(existing)
+        # Una sola sentencia multi-fila para que rowcount sea fiable
+        rowcount = db.session.execute(insert_ignore(collection_recipes).values([{'collection_id': collection.id, 'recipe_id': recipe_id} for recipe_id in changed])).rowcount if changed else 0
+    else:
+        changed = sorted(members)
+        rowcount = -db.session.execute(delete(collection_recipes).where(collection_recipes.c.collection_id == collection.id, collection_recipes.c.recipe_id.in_(changed))).rowcount if changed else 0
+
+    recipe_count = collection.recipe_count
+    if rowcount:
+        RecipeCollection.touch(collection.id, values={RecipeCollection.recipe_count: RecipeCollection.recipe_count + rowcount})
+        recipe_count = db.session.query(RecipeCollection.recipe_count).filter(RecipeCollection.id == collection.id).scalar()
+    db.session.commit()
+    return {
+        'collection_id': collection.id,
+        'added' if adding else 'removed': changed,
+        'recipe_count': recipe_count
+    }
+
+
+def _bulk_recipe_ids():
+    """Lista recipe_ids del cuerpo JSON, o (respuesta de error, código)"""
+    recipe_ids = (request.get_json(silent=True) or {}).get('recipe_ids')
+    if not isinstance(recipe_ids, list) or not all(isinstance(recipe_id, int) for recipe_id in recipe_ids):
+        return None, (jsonify({'error': 'recipe_ids debe ser una lista de ids'}), 400)
+    if len(recipe_ids) > COLLECTION_BULK_LIMIT:
+        return None, (jsonify({'error': f'Máximo {COLLECTION_BULK_LIMIT} recetas por petición'}), 400)
+    return recipe_ids, None
+
+
 @user_bp.route('/me/collections/<int:collection_id>/add/<int:recipe_id>', methods=['POST'])
 @jwt_required()
 def add_to_collection(collection_id, recipe_id):
     """Añadir receta a una colección"""
-    current_user_id = get_jwt_identity()
-    collection = RecipeCollection.query.filter_by(id=collection_id, user_id=current_user_id).first_or_404()
-    recipe = Recipe.query.get_or_404(recipe_id)
-    
-    if recipe not in collection.recipes:
-        collection.recipes.append(recipe)
-        db.session.commit()
-        
-    return jsonify(collection.to_dict())
+    if db.session.get(Recipe, recipe_id) is None:
+        return jsonify({'error': 'Receta no encontrada'}), 404
+    return jsonify(_change_membership(collection_id, [recipe_id], adding=True))
 
 
 @user_bp.route('/me/collections/<int:collection_id>/recipes/<int:recipe_id>', methods=['DELETE'])
 @jwt_required()
 def remove_from_collection(collection_id, recipe_id):
     """Eliminar receta de una colección"""
-    current_user_id = get_jwt_identity()
-    collection = RecipeCollection.query.filter_by(id=collection_id, user_id=current_user_id).first_or_404()
-    recipe = Recipe.query.get_or_404(recipe_id)
-    
-    if recipe in collection.recipes:
-        collection.recipes.remove(recipe)
-        db.session.commit()
-        
-    return jsonify(collection.to_dict())
+    return jsonify(_change_membership(collection_id, [recipe_id], adding=False))
+
+
+@user_bp.route('/me/collections/<int:collection_id>/recipes', methods=['POST'])
+@jwt_required()
+def add_many_to_collection(collection_id):
+    """Añadir varias recetas: {recipe_ids: [...]}; las que no existen o ya estaban se ignoran"""
+    recipe_ids, error = _bulk_recipe_ids()
+    if error:
+        return error
+    return jsonify(_change_membership(collection_id, recipe_ids, adding=True))
+
+
+@user_bp.route('/me/collections/<int:collection_id>/recipes', methods=['DELETE'])
+@jwt_required()
+def remove_many_from_collection(collection_id):
+    """Quitar varias recetas: {recipe_ids: [...]}"""
+    recipe_ids, error = _bulk_recipe_ids()
+    if error:
+        return error
+    return jsonify(_change_membership(collection_id, recipe_ids, adding=False))
 
 
 @user_bp.route('/me/collections/<int:collection_id>', methods=['DELETE'])
@@ -234,6 +640,7 @@ def delete_collection(collection_id):
     collection = RecipeCollection.query.filter_by(id=collection_id, user_id=current_user_id).first_or_404()
     
     db.session.delete(collection)
+    User.touch(current_user_id)
     db.session.commit()
     return jsonify({'message': 'Colección eliminada'}), 200
 
@@ -365,10 +772,6 @@ def generate_collection_shopping_list(collection_id):
 @jwt_required()
 def update_profile():
     """Actualiza el perfil del usuario actual"""
-    import os
-    from werkzeug.utils import secure_filename
-    from flask import current_app
-    from datetime import datetime
     import bcrypt
 
     current_user_id = get_jwt_identity()
@@ -406,21 +809,26 @@ def update_profile():
         if 'avatar' in files:
             file = files['avatar']
             if file and file.filename:
-                upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'avatars')
-                os.makedirs(upload_folder, exist_ok=True)
-                
-                filename = secure_filename(f"avatar_{user.id}_{int(datetime.utcnow().timestamp())}_{file.filename}")
-                file.save(os.path.join(upload_folder, filename))
-                user.avatar_url = f"/static/uploads/avatars/{filename}"
-        elif 'avatar_url' in data:
+                avatar_url = save_image(file)
+                if avatar_url != user.avatar_url:
+                    user.avatar_url = avatar_url
+                    user.avatar_variants = None
+        elif 'avatar_url' in data and data['avatar_url'] != user.avatar_url:
              user.avatar_url = data['avatar_url']
+             user.avatar_variants = None
 
+        shown_in = _recipes_showing_user(user.id)
+        Recipe.touch(*shown_in)
         db.session.commit()
+        invalidate_recipes(*shown_in)
         return jsonify({
             'message': 'Perfil actualizado correctamente',
             'user': user.to_dict()
         }), 200
         
+    except InvalidUpload as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
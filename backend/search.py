@@ -0,0 +1,155 @@
+"""
+Motor de búsqueda de recetas para ChefCommunity
+Índice invertido en la tabla search_terms (término -> receta, peso) sobre
+título, descripción, ingredientes, instrucciones y pasos. Al vivir en MySQL
+lo comparten todos los workers de gunicorn.
+"""
+import re
+import unicodedata
+
+from sqlalchemy import case, func, insert, literal, select, union_all
+
+from models import db, Recipe, SearchTerm
+
+# Peso de cada campo en la relevancia
+FIELD_WEIGHTS = {
+    'title': 10,
+    'ingredients': 5,
+    'description': 2,
+    'steps': 1,
+}
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+
+STOPWORDS = {
+    'a', 'al', 'ante', 'con', 'como', 'contra', 'de', 'del', 'desde', 'e', 'el', 'en',
+    'entre', 'es', 'esta', 'este', 'hasta', 'la', 'las', 'le', 'les', 'lo', 'los', 'mas',
+    'muy', 'no', 'o', 'para', 'pero', 'por', 'que', 'se', 'si', 'sin', 'sobre', 'su',
+    'sus', 'tras', 'u', 'un', 'una', 'unas', 'unos', 'y', 'ya',
+}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold_accents(text):
+    """Minúsculas y sin tildes: 'Tortílla' -> 'tortilla', 'Piñón' -> 'pinon'"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(token):
+    """Reducción ligera de plurales en español (tomates -> tomate, limones -> limon)"""
+    if len(token) > 4 and token.endswith('es') and token[-3] in 'lnrdz':
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lista de términos normalizados (sin tildes, sin stopwords, plurales reducidos)"""
+    if not text:
+        return []
+    terms = []
+    for token in _TOKEN_RE.findall(fold_accents(text)):
+        if len(token) < MIN_TERM_LENGTH or token in STOPWORDS:
+            continue
+        terms.append(stem(token)[:MAX_TERM_LENGTH])
+    return terms
+
+
+def recipe_terms(recipe):
+    """Calcula {término: peso} de una receta; cada campo suma su peso una vez por término"""
+    return document_terms(
+        recipe.title,
+        recipe.description,
+        [ri.ingredient.name for ri in recipe.ingredients if ri.ingredient],
+        recipe.instructions,
+        [s.text for s in recipe.steps],
+    )
+
+
+def document_terms(title, description, ingredient_names, instructions, step_texts):
+    """Lo mismo que recipe_terms a partir de los textos sueltos (importación masiva)"""
+    fields = {
+        'title': title,
+        'description': description,
+        'ingredients': ' '.join(ingredient_names),
+        'steps': ' '.join([instructions or ''] + list(step_texts)),
+    }
+    weights = {}
+    for field, text in fields.items():
+        for term in set(tokenize(text)):
+            weights[term] = weights.get(term, 0) + FIELD_WEIGHTS[field]
+    return weights
+
+
+def index_recipe(recipe):
+    """Reindexa una receta dentro de la transacción actual (sin commit)"""
+    # Ingredientes y pasos en consultas fijas, no uno a uno
+    recipe = Recipe.query.options(*Recipe.eager_options(include_author=False)).populate_existing().get(recipe.id)
+    remove_recipe(recipe.id)
+    rows = [{'term': term, 'recipe_id': recipe.id, 'weight': weight}
+            for term, weight in recipe_terms(recipe).items()]
+    if rows:
+        db.session.execute(insert(SearchTerm), rows)
+
+
+def remove_recipe(recipe_id):
+    """Elimina del índice los términos de una receta (sin commit)"""
+    SearchTerm.query.filter_by(recipe_id=recipe_id).delete(synchronize_session=False)
+
+
+def search_scores(query_text):
+    """
+    Subconsulta (recipe_id, score) con las recetas que contienen todos los
+    términos buscados, por prefijo (LIKE 'term%' usa el índice de term).
+    Una coincidencia exacta puntúa el doble que una por prefijo.
+    Devuelve None si la búsqueda no tiene términos indexables.
+    """
+    terms = list(dict.fromkeys(tokenize(query_text)))
+    if not terms:
+        return None
+
+    per_term = []
+    for position, term in enumerate(terms):
+        prefix = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        per_term.append(
+            select(
+                SearchTerm.recipe_id.label('recipe_id'),
+                literal(position).label('position'),
+                (SearchTerm.weight * case((SearchTerm.term == term, 2), else_=1)).label('score')
+            ).where(SearchTerm.term.like(prefix, escape='\\'))
+        )
+
+    matches = union_all(*per_term).subquery()
+    return select(
+        matches.c.recipe_id,
+        func.sum(matches.c.score).label('score')
+    ).group_by(matches.c.recipe_id).having(
+        func.count(func.distinct(matches.c.position)) == len(terms)
+    ).subquery()
+
+
+def rebuild_index(batch_size=500):
+    """Regenera el índice completo desde cero, por lotes de recetas"""
+    SearchTerm.query.delete(synchronize_session=False)
+    db.session.commit()
+
+    indexed = 0
+    last_id = 0
+    while True:
+        recipes = Recipe.query.options(*Recipe.eager_options(include_author=False)).filter(Recipe.id > last_id).order_by(Recipe.id).limit(batch_size).all()
+        if not recipes:
+            break
+        rows = [{'term': term, 'recipe_id': recipe.id, 'weight': weight}
+                for recipe in recipes
+                for term, weight in recipe_terms(recipe).items()]
+        if rows:
+            db.session.execute(insert(SearchTerm), rows)
+        db.session.commit()
+        indexed += len(recipes)
+        last_id = recipes[-1].id
+        db.session.expunge_all()
+    return indexed
@@ -0,0 +1,213 @@
+"""
+Almacenamiento de archivos subidos
+Los archivos se guardan bajo el sha256 de su contenido (subir dos veces la
+misma foto no crea otra copia) y se copian por bloques, sin cargarlos enteros
+en memoria. Backends: 'local' (directorio static/uploads servido por Flask o
+nginx) y 's3' (cualquier servicio compatible: AWS, MinIO...), que permite
+varios nodos de API sin disco compartido.
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 1024 * 1024
+
+# Las claves con hash nunca cambian de contenido
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class LocalStorage:
+    """Directorio local; las escrituras van a un temporal y se renombran al final"""
+
+    name = 'local'
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, fileobj, key, content_type=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def adopt(self, path, key, content_type=None):
+        """Mueve un archivo ya escrito a su clave; sólo copia si está en otro disco"""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            with open(path, 'rb') as source:
+                self.put(source, key, content_type)
+            os.remove(path)
+
+
+class S3Storage:
+    """Bucket S3 o compatible (requiere el paquete boto3)"""
+
+    name = 's3'
+
+    def __init__(self, bucket, base_url, endpoint_url=None, region=None, access_key=None, secret_key=None):
+        import boto3  # dependencia opcional: sólo si STORAGE_BACKEND=s3
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region, aws_access_key_id=access_key, aws_secret_access_key=secret_key)
+        self.bucket = bucket
+        self.base_url = base_url
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def put(self, fileobj, key, content_type=None):
+        # upload_fileobj sube por partes los archivos grandes
+        extra = {'CacheControl': IMMUTABLE_CACHE_CONTROL}
+        if content_type:
+            extra['ContentType'] = content_type
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def adopt(self, path, key, content_type=None):
+        with open(path, 'rb') as source:
+            self.put(source, key, content_type)
+        os.remove(path)
+
+
+class Storage:
+    """Fachada: claves por contenido y traducción entre claves y URLs públicas"""
+
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app):
+        backend = app.config.get('STORAGE_BACKEND', 'local')
+        if backend == 's3':
+            bucket = app.config['STORAGE_S3_BUCKET']
+            endpoint_url = app.config.get('STORAGE_S3_ENDPOINT_URL')
+            region = app.config.get('STORAGE_S3_REGION')
+            self.backend = S3Storage(
+                bucket,
+                app.config.get('STORAGE_PUBLIC_URL') or self.default_s3_url(bucket, endpoint_url, region),
+                endpoint_url=endpoint_url,
+                region=region,
+                access_key=app.config.get('STORAGE_S3_ACCESS_KEY'),
+                secret_key=app.config.get('STORAGE_S3_SECRET_KEY'),
+            )
+        else:
+            root = app.config.get('STORAGE_LOCAL_ROOT') or os.path.join(app.root_path, 'static', 'uploads')
+            self.backend = LocalStorage(root, app.config.get('STORAGE_PUBLIC_URL') or '/static/uploads/')
+
+    @staticmethod
+    def default_s3_url(bucket, endpoint_url=None, region=None):
+        """Prefijo público si no se indica STORAGE_PUBLIC_URL: el endpoint (MinIO...) o AWS"""
+        if not bucket:
+            raise RuntimeError('STORAGE_S3_BUCKET es obligatorio con STORAGE_BACKEND=s3')
+        if endpoint_url:
+            return f"{endpoint_url.rstrip('/')}/{bucket}"
+        if region:
+            return f"https://{bucket}.s3.{region}.amazonaws.com"
+        return f"https://{bucket}.s3.amazonaws.com"
+
+    def url(self, key):
+        return self.backend.base_url.rstrip('/') + '/' + key
+
+    def key_for_url(self, url):
+        """Clave de una URL de este almacenamiento (None si es externa)"""
+        prefix = self.backend.base_url.rstrip('/') + '/'
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+        return None
+
+    def save(self, fileobj, filename=None, content_type=None):
+        """
+        Guarda un archivo bajo el hash de su contenido y devuelve su URL. Se
+        copia por bloques a un temporal mientras se calcula el hash; si esa
+        clave ya existe no se vuelve a escribir.
+        """
+        digest = hashlib.sha256()
+        with tempfile.TemporaryFile() as spool:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                spool.write(chunk)
+            spool.seek(0)
+
+            h = digest.hexdigest()
+            key = f'{h[:2]}/{h[2:4]}/{h}{_extension(filename, content_type)}'
+            if not self.backend.exists(key):
+                self.backend.put(spool, key, content_type or mimetypes.guess_type(key)[0])
+        return self.url(key)
+
+    def adopt(self, path, content_type=None):
+        """
+        Como save, pero para un archivo completo en disco (subidas por partes):
+        se lee una vez para el hash y después se mueve, sin otra copia en
+        local. El archivo deja de existir en path. Devuelve su URL.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as source:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+
+        h = digest.hexdigest()
+        key = f'{h[:2]}/{h[2:4]}/{h}{_extension(None, content_type)}'
+        if self.backend.exists(key):
+            os.remove(path)
+        else:
+            self.backend.adopt(path, key, content_type or mimetypes.guess_type(key)[0])
+        return self.url(key)
+
+    def put(self, fileobj, key, content_type=None):
+        """Escribe con una clave fija (p.ej. derivada de otra clave con hash) y devuelve su URL"""
+        self.backend.put(fileobj, key, content_type or mimetypes.guess_type(key)[0])
+        return self.url(key)
+
+    def exists(self, key):
+        return self.backend.exists(key)
+
+    def open(self, key):
+        return self.backend.open(key)
+
+
+def _extension(filename, content_type=None):
+    ext = os.path.splitext(secure_filename(filename or ''))[1].lower()
+    if not ext and content_type:
+        ext = mimetypes.guess_extension(content_type) or ''
+    return ext[:10]
+
+
+storage = Storage()
@@ -0,0 +1,159 @@
+"""
+Ranking "trending" para ChefCommunity
+Cada evento (like, review, añadir al plan semanal, publicar) suma
+peso * exp((t - epoch) / tau) a la puntuación de su receta. Multiplicar
+todas las puntuaciones por el mismo factor no cambia el orden, así que el
+decaimiento no obliga a reescribir la tabla: basta con sumar los eventos
+nuevos. Cada cierto tiempo se mueve epoch y se reescalan (rebase) para que
+los exponentes no crezcan sin límite. Un like cuenta una vez por (usuario,
+receta) dentro de LIKE_DEDUPE y una review una sola vez por id (editarla
+la vuelve a fechar, pero no suma otra vez).
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, insert, literal, select, update
+
+from models import db, Recipe, Like, Review, MealPlan, TrendingScore, TrendingState, TrendingLike, TrendingReview
+
+# Peso de cada tipo de evento
+EVENT_WEIGHTS = {
+    'recipe': 1.0,
+    'like': 3.0,
+    'meal_plan': 4.0,
+    'review': 5.0,
+}
+
+HALF_LIFE_HOURS = 48
+TAU_SECONDS = HALF_LIFE_HOURS * 3600 / math.log(2)
+
+# Margen para transacciones que confirman tarde: sólo se procesa hasta now - SETTLE
+SETTLE = timedelta(minutes=2)
+
+# Historia considerada en la primera ejecución
+BOOTSTRAP = timedelta(days=14)
+
+# Cada cuánto se mueve epoch (exp(30 días / tau) ~ 3e4, lejos de desbordar)
+REBASE_AFTER = timedelta(days=30)
+
+# Un like quitado y vuelto a dar dentro de este plazo no vuelve a puntuar
+# (~3,5 vidas medias: pasado ese tiempo apenas pesaría frente al original)
+LIKE_DEDUPE = timedelta(days=7)
+
+
+def _event_sources(since, until):
+    """(tipo, consulta de (recipe_id, fecha)) de los eventos en (since, until] de recetas existentes"""
+    def window(model, *columns):
+        return select(model.recipe_id, model.created_at, *columns).join(Recipe, Recipe.id == model.recipe_id).where(model.created_at > since, model.created_at <= until)
+    return [
+        ('recipe', select(Recipe.id, Recipe.created_at).where(Recipe.created_at > since, Recipe.created_at <= until)),
+        ('like', window(Like, Like.user_id)),
+        ('review', window(Review, Review.id)),
+        ('meal_plan', window(MealPlan)),
+    ]
+
+
+def _first_likes(rows, until):
+    """
+    Filtra las filas (recipe_id, fecha, user_id) de likes: uno por (usuario,
+    receta), el más antiguo, y sólo si ese par no se puntuó en LIKE_DEDUPE.
+    Quitar un like no resta, así que sin esto dar y quitar like repetidamente
+    inflaría la puntuación. Anota los pares puntuados (sin commit).
+    """
+    TrendingLike.query.filter(TrendingLike.scored_at <= until - LIKE_DEDUPE).delete(synchronize_session=False)
+    first = {}
+    for recipe_id, created_at, user_id in sorted(rows, key=lambda row: row[1]):
+        first.setdefault((user_id, recipe_id), created_at)
+    if not first:
+        return []
+
+    scored = {tuple(pair) for pair in db.session.execute(
+        select(TrendingLike.user_id, TrendingLike.recipe_id).where(
+            TrendingLike.user_id.in_({user_id for user_id, _ in first}),
+            TrendingLike.recipe_id.in_({recipe_id for _, recipe_id in first})
+        )
+    )}
+    new = {pair: created_at for pair, created_at in first.items() if pair not in scored}
+    if new:
+        db.session.execute(insert(TrendingLike), [
+            {'user_id': user_id, 'recipe_id': recipe_id, 'scored_at': created_at}
+            for (user_id, recipe_id), created_at in new.items()
+        ])
+    return [(recipe_id, created_at) for (_, recipe_id), created_at in new.items()]
+
+
+def _first_reviews(rows):
+    """
+    Filtra las filas (recipe_id, fecha, review_id) de reviews: sólo las que
+    no se han puntuado nunca. Editar una review mueve su created_at a la
+    ventana actual; sin esto cada edición contaría como una review nueva.
+    Anota las puntuadas (sin commit).
+    """
+    if not rows:
+        return []
+    scored = {review_id for review_id, in db.session.execute(
+        select(TrendingReview.review_id).where(TrendingReview.review_id.in_({review_id for _, _, review_id in rows}))
+    )}
+    new = [(recipe_id, created_at, review_id) for recipe_id, created_at, review_id in rows if review_id not in scored]
+    if new:
+        db.session.execute(insert(TrendingReview), [{'review_id': review_id} for _, _, review_id in new])
+    return [(recipe_id, created_at) for recipe_id, created_at, _ in new]
+
+
+def _rebase(state, new_epoch):
+    factor = math.exp(-(new_epoch - state.epoch).total_seconds() / TAU_SECONDS)
+    TrendingScore.query.update({TrendingScore.score: TrendingScore.score * factor}, synchronize_session=False)
+    state.epoch = new_epoch
+
+
+def refresh_trending(now=None):
+    """
+    Suma a trending_scores los eventos ocurridos desde la última ejecución,
+    en una transacción y con la fila de estado bloqueada (no se solapan dos
+    ejecuciones). El coste depende de los eventos nuevos, no del historial.
+    Devuelve el número de eventos procesados.
+    """
+    until = (now or datetime.utcnow()) - SETTLE
+    state = TrendingState.query.with_for_update().get(1)
+    if state is None:
+        # Primera ejecución: todas las recetas con puntuación 0 y BOOTSTRAP de historia
+        state = TrendingState(id=1, epoch=until, processed_until=until - BOOTSTRAP)
+        db.session.add(state)
+        db.session.execute(insert(TrendingScore).from_select(['recipe_id', 'score'], select(Recipe.id, literal(0.0))))
+        db.session.flush()
+
+    if until - state.epoch > REBASE_AFTER:
+        _rebase(state, until)
+
+    deltas = defaultdict(float)
+    events = 0
+    for kind, query in _event_sources(state.processed_until, until):
+        weight = EVENT_WEIGHTS[kind]
+        rows = db.session.execute(query).all()
+        if kind == 'like':
+            rows = _first_likes(rows, until)
+        elif kind == 'review':
+            rows = _first_reviews(rows)
+        for recipe_id, created_at in rows:
+            deltas[recipe_id] += weight * math.exp((created_at - state.epoch).total_seconds() / TAU_SECONDS)
+            events += 1
+
+    if deltas:
+        existing = {recipe_id for recipe_id, in db.session.execute(
+            select(TrendingScore.recipe_id).where(TrendingScore.recipe_id.in_(list(deltas)))
+        )}
+        updates = [{'rid': recipe_id, 'delta': delta} for recipe_id, delta in deltas.items() if recipe_id in existing]
+        if updates:
+            table = TrendingScore.__table__
+            db.session.execute(
+                update(table).where(table.c.recipe_id == bindparam('rid')).values(score=table.c.score + bindparam('delta')),
+                updates
+            )
+        inserts = [{'recipe_id': recipe_id, 'score': delta} for recipe_id, delta in deltas.items() if recipe_id not in existing]
+        if inserts:
+            db.session.execute(insert(TrendingScore), inserts)
+
+    state.processed_until = until
+    db.session.commit()
+    return events
@@ -0,0 +1,32 @@
+"""
+Actualiza las puntuaciones de sort=trending con los eventos nuevos
+Uso: python update_trending.py            (una pasada, p.ej. desde cron)
+     python update_trending.py --every 300 (en bucle cada 300 segundos)
+"""
+import argparse
+import time
+
+from app import app, db
+from trending import refresh_trending
+
+
+def run_once():
+    with app.app_context():
+        try:
+            db.create_all()
+            events = refresh_trending()
+            print(f"✅ Trending actualizado con {events} eventos nuevos.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Error actualizando trending: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--every', type=int, default=0, help='segundos entre pasadas (0 = una sola)')
+    args = parser.parse_args()
+
+    run_once()
+    while args.every > 0:
+        time.sleep(args.every)
+        run_once()
@@ -1,4 +1,5 @@
 import { useState } from 'react';
+import { api } from '../services/api';
 
 interface CreateRecipeProps {
     onCancel: () => void;
@@ -17,7 +18,8 @@ const CreateRecipe: React.FC<CreateRecipeProps> = ({ onCancel, onSuccess, token,
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState('');
     const [mainImage, setMainImage] = useState<File | null>(null);
-    const [video] = useState<File | null>(null);
+    const [video, setVideo] = useState<File | null>(null);
+    const [videoProgress, setVideoProgress] = useState<number | null>(null);
 
     // Ingredient State
     const [ingredients, setIngredients] = useState<{ name: string, quantity: string }[]>(
@@ -105,9 +107,15 @@ const CreateRecipe: React.FC<CreateRecipeProps> = ({ onCancel, onSuccess, token,
         formData.append('ingredients', JSON.stringify(ingredients));
 
         if (mainImage) formData.append('main_image', mainImage);
-        if (video) formData.append('video', video);
 
         try {
+            // El vídeo va antes por trozos a /api/uploads; la receta sólo lleva su id
+            if (video) {
+                setVideoProgress(0);
+                const uploadId = await api.uploads.upload(video, 'video', setVideoProgress);
+                formData.append('video_upload_id', uploadId);
+            }
+
             const url = initialRecipe ? `/api/recipes/${initialRecipe.id}` : '/api/recipes/';
 
             let finalResponse;
@@ -136,6 +144,7 @@ const CreateRecipe: React.FC<CreateRecipeProps> = ({ onCancel, onSuccess, token,
             setError(err.message || 'Error de conexión');
         } finally {
             setLoading(false);
+            setVideoProgress(null);
         }
     };
 
@@ -198,6 +207,23 @@ const CreateRecipe: React.FC<CreateRecipeProps> = ({ onCancel, onSuccess, token,
                             />
                         </div>
 
+                        <div className="md:col-span-2">
+                            <label className="block font-mono text-xs font-bold uppercase tracking-wider mb-2 text-secondary dark:text-primary">
+                                Vídeo (Opcional)
+                            </label>
+                            <input
+                                type="file"
+                                accept="video/mp4,video/webm,video/quicktime"
+                                onChange={e => setVideo(e.target.files ? e.target.files[0] : null)}
+                                className="w-full bg-[#f0f0f0] text-black border-2 border-black p-2 font-mono file:mr-4 file:py-1 file:px-4 file:border-0 file:text-xs file:font-bold file:bg-primary file:text-white hover:file:opacity-80 transition-all"
+                            />
+                            {videoProgress !== null && (
+                                <p className="font-mono text-xs mt-2 text-[#5D4037] dark:text-[#b9a89d]">
+                                    {videoProgress < 1 ? `Subiendo vídeo... ${Math.round(videoProgress * 100)}%` : 'Procesando vídeo...'}
+                                </p>
+                            )}
+                        </div>
+
                         <div className="md:col-span-2">
                             <label className="block font-mono text-xs font-bold uppercase tracking-wider mb-2 text-secondary dark:text-primary">
                                 Descripción
@@ -69,6 +69,28 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
 
     // Collection Detail View State
     const [viewingCollection, setViewingCollection] = useState<any>(null);
+    const [collectionRecipes, setCollectionRecipes] = useState<any[]>([]);
+    const [collectionCursor, setCollectionCursor] = useState<string | null>(null);
+
+    // El perfil sólo trae resúmenes; las recetas de la colección van por páginas
+    const fetchCollectionRecipes = async (collectionId: number, cursor: string | null = null) => {
+        try {
+            const query = `view=card${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`;
+            const res = await fetch(`/api/users/${profileUser.id}/collections/${collectionId}/recipes?${query}`);
+            if (res.ok) {
+                const data = await res.json();
+                setCollectionRecipes(prev => cursor ? [...prev, ...data.recipes] : data.recipes);
+                setCollectionCursor(data.next_cursor);
+            }
+        } catch (e) { console.error("Failed to fetch collection recipes", e); }
+    };
+
+    const openCollection = (col: any) => {
+        setViewingCollection(col);
+        setCollectionRecipes([]);
+        setCollectionCursor(null);
+        fetchCollectionRecipes(col.id);
+    };
 
     // Shopping List State
     const [isShoppingListModalOpen, setIsShoppingListModalOpen] = useState(false);
@@ -305,14 +327,13 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
                 collectionName = profileData.collections.find((c: any) => c.id.toString() === targetCollectionId)?.name || "Colección";
             }
 
-            // 2. Add Selected Recipes
+            // 2. Add Selected Recipes (una sola petición)
             if (selectedRecipes.length > 0) {
-                for (const rid of selectedRecipes) {
-                    await fetch(`/api/users/me/collections/${targetCollectionId}/add/${rid}`, {
-                        method: 'POST',
-                        headers: { 'Authorization': `Bearer ${token}` }
-                    });
-                }
+                await fetch(`/api/users/me/collections/${targetCollectionId}/recipes`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'Authorization': `Bearer ${token}` },
+                    body: JSON.stringify({ recipe_ids: selectedRecipes })
+                });
             }
 
             // 3. Refresh Profile Data
@@ -389,19 +410,18 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
         if (!token || !viewingCollection || selectedFavoritesToAdd.length === 0) return;
 
         try {
-            for (const rid of selectedFavoritesToAdd) {
-                await fetch(`/api/users/me/collections/${viewingCollection.id}/add/${rid}`, {
-                    method: 'POST',
-                    headers: { 'Authorization': `Bearer ${token}` }
-                });
-            }
+            await fetch(`/api/users/me/collections/${viewingCollection.id}/recipes`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'Authorization': `Bearer ${token}` },
+                body: JSON.stringify({ recipe_ids: selectedFavoritesToAdd })
+            });
 
             // Refresh viewing collection
             const res = await fetch(`/api/users/${profileUser.id}`, { headers: { 'Authorization': `Bearer ${token}` } });
             const data = await res.json();
             setProfileData(data);
             const updatedCol = data.collections.find((c: any) => c.id === viewingCollection.id);
-            if (updatedCol) setViewingCollection(updatedCol);
+            if (updatedCol) openCollection(updatedCol);
 
             setIsAddFromFavoritesOpen(false);
             setSelectedFavoritesToAdd([]);
@@ -818,7 +838,7 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
 
                                         <div className="flex flex-wrap justify-center gap-4">
                                             <div className="bg-primary/20 text-primary px-3 py-1 rounded font-bold font-mono text-sm border border-primary/30 flex items-center">
-                                                {viewingCollection.recipes?.length || 0} RECETAS
+                                                {viewingCollection.recipe_count || 0} RECETAS
                                             </div>
 
                                             {isOwner && (
@@ -865,8 +885,8 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
                                 </div>
 
                                 <div className="grid grid-cols-2 sm:grid-cols-2 lg:grid-cols-3 gap-3 sm:gap-6">
-                                    {viewingCollection.recipes && viewingCollection.recipes.length > 0 ? (
-                                        viewingCollection.recipes.map((recipe: any) => (
+                                    {collectionRecipes.length > 0 ? (
+                                        collectionRecipes.map((recipe: any) => (
                                             <RecipeCard
                                                 key={recipe.id}
                                                 recipe={{
@@ -889,9 +909,9 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
                                                                     })
                                                                         .then(res => {
                                                                             if (res.ok) {
+                                                                                setCollectionRecipes(prev => prev.filter((r: any) => r.id !== recipe.id));
                                                                                 setViewingCollection((prev: any) => ({
                                                                                     ...prev,
-                                                                                    recipes: prev.recipes.filter((r: any) => r.id !== recipe.id),
                                                                                     recipe_count: prev.recipe_count - 1
                                                                                 }));
                                                                             }
@@ -913,13 +933,21 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
                                         </div>
                                     )}
                                 </div>
+                                {collectionCursor && (
+                                    <button
+                                        onClick={() => fetchCollectionRecipes(viewingCollection.id, collectionCursor)}
+                                        className="mt-8 w-full py-3 border-2 border-dashed border-[#5D4037] rounded-xl font-bold uppercase text-sm text-[#5D4037] dark:text-[#b9a89d] hover:border-primary hover:text-primary transition-colors"
+                                    >
+                                        Cargar más recetas
+                                    </button>
+                                )}
                             </div>
                         ) : (
                             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
                                 {profileData.collections.map((col: any) => (
                                     <div
                                         key={col.id}
-                                        onClick={() => setViewingCollection(col)}
+                                        onClick={() => openCollection(col)}
                                         className="bg-[#1a1614] border-2 border-[#5D4037] p-6 rounded shadow-retro-lg text-white relative group cursor-pointer hover:border-primary transition-colors hover:-translate-y-1"
                                     >
                                         <div className="absolute top-2 left-2 text-retro-green font-mono text-xs border border-retro-green px-1 rounded">
@@ -942,9 +970,17 @@ const Profile: React.FC<ProfileProps> = ({ profileUser, currentUser, token, init
                                         <h3 className="font-bold text-xl mb-2 mt-4">{col.name}</h3>
                                         <p className="text-[#b9a89d] text-sm font-mono line-clamp-2">{col.description}</p>
                                         <div className="mt-4 flex -space-x-2 overflow-hidden">
-                                            {/* Visual stack effect */}
-                                            <div className="w-8 h-8 rounded-full bg-gray-700 border border-black transform group-hover:translate-x-1 transition-transform"></div>
-                                            <div className="w-8 h-8 rounded-full bg-gray-600 border border-black transform group-hover:translate-x-1 transition-transform delay-75"></div>
+                                            {/* Visual stack effect: portadas de las primeras recetas */}
+                                            {col.cover_images && col.cover_images.length > 0 ? (
+                                                col.cover_images.map((url: string) => (
+                                                    <img key={url} src={url} alt="" loading="lazy" className="w-8 h-8 rounded-full object-cover border border-black transform group-hover:translate-x-1 transition-transform" />
+                                                ))
+                                            ) : (
+                                                <>
+                                                    <div className="w-8 h-8 rounded-full bg-gray-700 border border-black transform group-hover:translate-x-1 transition-transform"></div>
+                                                    <div className="w-8 h-8 rounded-full bg-gray-600 border border-black transform group-hover:translate-x-1 transition-transform delay-75"></div>
+                                                </>
+                                            )}
                                             <div className="w-8 h-8 rounded-full bg-gray-500 border border-black transform group-hover:translate-x-1 transition-transform delay-150 flex items-center justify-center text-xs font-bold">
                                                 <span translate="no" className="material-symbols-outlined notranslate text-sm">arrow_forward</span>
                                             </div>
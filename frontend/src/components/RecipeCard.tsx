@@ -5,6 +5,7 @@ interface Recipe {
     title: string;
     author?: string;
     main_image_url?: string;
+    card_image_url?: string;
     video_url?: string;
     category?: string;
     difficulty?: 'Fácil' | 'Media' | 'Difícil';
@@ -32,14 +33,15 @@ const RecipeCard: React.FC<RecipeCardProps> = ({ recipe, onClick, showAuthor = t
         title,
         author,
         main_image_url,
+        card_image_url,
         video_url,
         category,
         difficulty,
         prep_time
     } = recipe;
 
-    // Placeholder para imagen si no hay URL
-    const imageUrl = main_image_url || 'https://placehold.co/400x300/F5E6D3/5C4033?text=Sin+Imagen';
+    // Variante reducida si ya está generada; placeholder si no hay URL
+    const imageUrl = card_image_url || main_image_url || 'https://placehold.co/400x300/F5E6D3/5C4033?text=Sin+Imagen';
 
     // Color del badge de dificultad (Neutral Gray)
     const difficultyColors: Record<string, string> = {
@@ -20,6 +20,9 @@ type State = {
     isLiked: boolean;
     loading: boolean;
     submittingReview: boolean;
+    reviews: any[];
+    reviewsCursor: string | null;
+    loadingReviews: boolean;
     newRating: number;
     newComment: string;
     newPhoto: File | null;
@@ -33,6 +36,7 @@ type Action =
     | { type: 'TOGGLE_LIKE'; payload: boolean }
     | { type: 'SET_LOADING'; payload: boolean }
     | { type: 'SET_SUBMITTING_REVIEW'; payload: boolean }
+    | { type: 'SET_REVIEWS'; payload: { reviews: any[]; next_cursor: string | null }; append: boolean }
     | { type: 'RESET_REVIEW_FORM' }
     | { type: 'UPDATE_FIELD'; field: keyof State; value: any }
     | { type: 'SET_PLAN_MODAL'; payload: boolean }
@@ -43,6 +47,9 @@ const initialState: State = {
     isLiked: false,
     loading: false,
     submittingReview: false,
+    reviews: [],
+    reviewsCursor: null,
+    loadingReviews: false,
     newRating: 0,
     newComment: '',
     newPhoto: null,
@@ -66,6 +73,13 @@ function reducer(state: State, action: Action): State {
             return { ...state, loading: action.payload };
         case 'SET_SUBMITTING_REVIEW':
             return { ...state, submittingReview: action.payload };
+        case 'SET_REVIEWS':
+            return {
+                ...state,
+                reviews: action.append ? [...state.reviews, ...action.payload.reviews] : action.payload.reviews,
+                reviewsCursor: action.payload.next_cursor,
+                loadingReviews: false
+            };
         case 'UPDATE_FIELD':
             return { ...state, [action.field]: action.value };
         case 'RESET_REVIEW_FORM':
@@ -98,6 +112,9 @@ const RecipeDetail: React.FC<RecipeDetailProps> = ({ recipe, token, user, onAuth
         isLiked,
         loading,
         submittingReview,
+        reviews,
+        reviewsCursor,
+        loadingReviews,
         newRating,
         newComment,
         photoPreview,
@@ -112,7 +129,7 @@ const RecipeDetail: React.FC<RecipeDetailProps> = ({ recipe, token, user, onAuth
     const prep_time = activeRecipe?.prep_time || "--";
     const ingredients = activeRecipe?.ingredients || [];
     const instructions = activeRecipe?.instructions || "";
-    const reviews = activeRecipe?.reviews || [];
+    const reviewsTotal = activeRecipe?.rating_summary?.count ?? activeRecipe?.reviews_count ?? reviews.length;
 
     const isAuthor = user && recipe && user.id === recipe.author_id;
     const isAdmin = user && user.rol === 'admin';
@@ -167,6 +184,24 @@ const RecipeDetail: React.FC<RecipeDetailProps> = ({ recipe, token, user, onAuth
         }
     }, [token]);
 
+    // Las reviews llegan aparte y por páginas; el detalle sólo trae el resumen
+    const fetchReviews = useCallback(async (id: number, cursor: string | null = null) => {
+        if (!id) return;
+        dispatch({ type: 'UPDATE_FIELD', field: 'loadingReviews', value: true });
+        try {
+            const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+            const response = await fetch(`/api/recipes/${id}/reviews${query}`);
+            if (response.ok) {
+                const data = await response.json();
+                dispatch({ type: 'SET_REVIEWS', payload: data, append: !!cursor });
+                return;
+            }
+        } catch (err) {
+            console.error("Error fetching reviews", err);
+        }
+        dispatch({ type: 'UPDATE_FIELD', field: 'loadingReviews', value: false });
+    }, []);
+
     const handleAddToMealPlan = async (date: string, mealTime: string) => {
         if (!token) {
             alert("Debes iniciar sesión para planificar comidas.");
@@ -270,6 +305,7 @@ const RecipeDetail: React.FC<RecipeDetailProps> = ({ recipe, token, user, onAuth
             if (response.ok) {
                 dispatch({ type: 'RESET_REVIEW_FORM' });
                 fetchFullRecipe(activeRecipe.id);
+                fetchReviews(activeRecipe.id);
             } else {
                 const data = await response.json();
                 alert(data.error || "Error al enviar comentario");
@@ -305,6 +341,12 @@ const RecipeDetail: React.FC<RecipeDetailProps> = ({ recipe, token, user, onAuth
         }
     }, [recipe, token, fetchFullRecipe]);
 
+    useEffect(() => {
+        if (recipe?.id) {
+            fetchReviews(recipe.id);
+        }
+    }, [recipe?.id, fetchReviews]);
+
     return (
         <div className="grow container mx-auto px-4 py-8 max-w-5xl">
             {/* Breadcrumbs */}
@@ -440,9 +482,18 @@ const RecipeDetail: React.FC<RecipeDetailProps> = ({ recipe, token, user, onAuth
                         <h3 className="text-3xl font-black text-[#181411] dark:text-white mb-8 flex items-center gap-3 italic">
                             <span translate="no" className="material-symbols-outlined notranslate text-primary text-3xl">forum</span>
                             VALORACIONES Y COMENTARIOS
-                            <span className="font-mono text-sm font-normal text-gray-400 not-italic">({reviews.length})</span>
+                            <span className="font-mono text-sm font-normal text-gray-400 not-italic">({reviewsTotal})</span>
                         </h3>
                         <ReviewList reviews={reviews} />
+                        {reviewsCursor && (
+                            <button
+                                onClick={() => fetchReviews(activeRecipe.id, reviewsCursor)}
+                                disabled={loadingReviews}
+                                className="mt-6 w-full py-3 border-2 border-dashed border-gray-300 rounded-xl font-bold uppercase text-xs tracking-widest text-gray-500 hover:border-primary hover:text-primary transition-colors disabled:opacity-50"
+                            >
+                                {loadingReviews ? 'Cargando...' : 'Ver más comentarios'}
+                            </button>
+                        )}
                     </div>
 
                     <div className="lg:w-96 shrink-0">
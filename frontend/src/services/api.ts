@@ -1,3 +1,5 @@
+import type { UploadSession } from '../types';
+
 // Usar variable de entorno si existe (útil para S3), de lo contrario usa /api (útil para Docker y desarrollo local)
 // Forzamos el uso de la ruta relativa para que el navegador herede el protocolo HTTPS automáticamente
 const API_BASE = '/api';
@@ -28,6 +30,45 @@ async function request<T>(endpoint: string, options: RequestInit = {}): Promise<
     return response.json();
 }
 
+const UPLOAD_POLL_MS = 2000;
+
+/**
+ * Subida por partes: abre la sesión, envía trozos con Content-Range
+ * (reanudando desde el offset que devuelve el servidor en un 409) y espera
+ * a que el worker termine de procesarla. Devuelve el id de la subida.
+ */
+async function uploadFile(file: File, kind: UploadSession['kind'], onProgress?: (fraction: number) => void): Promise<string> {
+    const session = await request<UploadSession>('/uploads/', { method: 'POST', body: JSON.stringify({ kind, size: file.size, filename: file.name }) });
+    const token = localStorage.getItem('token');
+    let { status, offset } = session;
+
+    while (status === 'uploading') {
+        const end = Math.min(offset + (session.chunk_size || file.size), file.size);
+        const response = await fetch(`${API_BASE}/uploads/${session.id}`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/octet-stream',
+                'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`,
+                ...(token ? { 'Authorization': `Bearer ${token}` } : {}),
+            },
+            body: file.slice(offset, end),
+        });
+        const data = await response.json().catch(() => ({ error: 'Unknown error' }));
+        if (!response.ok && response.status !== 409) {
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        }
+        ({ status, offset } = data as UploadSession);
+        onProgress?.(offset / file.size);
+    }
+
+    while (status === 'processing') {
+        await new Promise(resolve => setTimeout(resolve, UPLOAD_POLL_MS));
+        ({ status } = await request<UploadSession>(`/uploads/${session.id}`));
+    }
+    if (status !== 'complete') throw new Error('La subida ha fallado');
+    return session.id;
+}
+
 export const api = {
     auth: {
         login: (credentials: any) => request<any>('/auth/login/', { method: 'POST', body: JSON.stringify(credentials) }),
@@ -72,8 +113,26 @@ export const api = {
         getFavorites: () => request<any[]>('/users/me/likes/'),
         generateShoppingList: () => request<any[]>('/users/me/shopping-list/generate/'),
     },
+    uploads: {
+        upload: uploadFile,
+    },
     admin: {
-        getUsers: () => request<any[]>('/users/all/'),
+        getUsers: (params: { search?: string; rol?: string; sort?: string; cursor?: string | null; limit?: number } = {}) => {
+            const query = new URLSearchParams({ limit: String(params.limit || 50) });
+            if (params.search) query.append('search', params.search);
+            if (params.rol) query.append('rol', params.rol);
+            if (params.sort) query.append('sort', params.sort);
+            if (params.cursor) query.append('cursor', params.cursor);
+            return request<{ users: any[]; next_cursor: string | null }>(`/users/all/?${query.toString()}`);
+        },
+        exportUsers: async () => {
+            const token = localStorage.getItem('token');
+            const response = await fetch(`${API_BASE}/users/all/export`, {
+                headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+            });
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            return response.blob();
+        },
         updateUser: (id: number, data: any) => request<any>(`/users/${id}/`, { method: 'PUT', body: JSON.stringify(data) }),
         deleteUser: (id: number) => request<any>(`/users/${id}/`, { method: 'DELETE' }),
     },
@@ -20,6 +20,12 @@ export interface RecipeIngredient {
     quantity: number;
 }
 
+export interface RatingSummary {
+    average: number;
+    count: number;
+    histogram: Record<'1' | '2' | '3' | '4' | '5', number>;
+}
+
 export interface Recipe {
     id: number;
     title: string;
@@ -28,6 +34,7 @@ export interface Recipe {
     category?: string;
     video_url?: string;
     main_image_url?: string;
+    card_image_url?: string;
     image_url?: string;
     difficulty?: 'Fácil' | 'Media' | 'Difícil';
     prep_time?: number;
@@ -36,6 +43,9 @@ export interface Recipe {
     author?: string;
     author_avatar?: string;
     likes_count: number;
+    avg_rating?: number;
+    reviews_count?: number;
+    rating_summary?: RatingSummary;
     is_liked?: boolean;
     created_at: string;
     ingredients?: RecipeIngredient[];
@@ -57,5 +67,16 @@ export interface Collection {
     name: string;
     description?: string;
     recipe_count: number;
+    cover_images?: string[];
     recipes?: Recipe[];
 }
+
+export interface UploadSession {
+    id: string;
+    kind: 'image' | 'video';
+    size: number;
+    offset: number;
+    status: 'uploading' | 'processing' | 'complete' | 'failed';
+    url: string | null;
+    chunk_size?: number;
+}
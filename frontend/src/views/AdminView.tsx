@@ -10,6 +10,10 @@ interface AdminViewProps {
 const AdminView: React.FC<AdminViewProps> = ({ onEditRecipe, onUserClick }) => {
     const [activeTab, setActiveTab] = useState<'recipes' | 'users'>('recipes');
     const [users, setUsers] = useState<any[]>([]);
+    const [usersCursor, setUsersCursor] = useState<string | null>(null);
+    const [userSearch, setUserSearch] = useState('');
+    const [userRol, setUserRol] = useState('');
+    const [userSort, setUserSort] = useState('newest');
     const [recipes, setRecipes] = useState<Recipe[]>([]);
     const [loading, setLoading] = useState(true);
 
@@ -17,8 +21,9 @@ const AdminView: React.FC<AdminViewProps> = ({ onEditRecipe, onUserClick }) => {
         setLoading(true);
         try {
             if (activeTab === 'users') {
-                const data = await api.admin.getUsers();
-                setUsers(Array.isArray(data) ? data : []);
+                const data = await api.admin.getUsers({ search: userSearch, rol: userRol, sort: userSort });
+                setUsers(data.users || []);
+                setUsersCursor(data.next_cursor);
             } else {
                 const data = await api.recipes.getAll({});
                 setRecipes(Array.isArray(data) ? data : []);
@@ -35,7 +40,31 @@ const AdminView: React.FC<AdminViewProps> = ({ onEditRecipe, onUserClick }) => {
 
     useEffect(() => {
         fetchData();
-    }, [activeTab]);
+    }, [activeTab, userRol, userSort]);
+
+    const loadMoreUsers = async () => {
+        try {
+            const data = await api.admin.getUsers({ search: userSearch, rol: userRol, sort: userSort, cursor: usersCursor });
+            setUsers([...users, ...(data.users || [])]);
+            setUsersCursor(data.next_cursor);
+        } catch (e) {
+            console.error(e);
+        }
+    };
+
+    const handleExportUsers = async () => {
+        try {
+            const blob = await api.admin.exportUsers();
+            const url = URL.createObjectURL(blob);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = 'usuarios.csv';
+            link.click();
+            URL.revokeObjectURL(url);
+        } catch (e) {
+            alert("Error al exportar usuarios.");
+        }
+    };
 
     const handleDeleteUser = async (id: number) => {
         if (window.confirm("¿Seguro que deseas eliminar este usuario y todo su contenido?")) {
@@ -80,6 +109,36 @@ const AdminView: React.FC<AdminViewProps> = ({ onEditRecipe, onUserClick }) => {
                 </button>
             </div>
 
+            {activeTab === 'users' && (
+                <div className="flex flex-wrap gap-4 mb-6 font-mono text-sm">
+                    <form onSubmit={(e) => { e.preventDefault(); fetchData(); }} className="flex gap-2">
+                        <input
+                            value={userSearch}
+                            onChange={(e) => setUserSearch(e.target.value)}
+                            placeholder="Buscar nombre o email"
+                            className="border-2 border-black rounded px-3 py-2 text-black"
+                        />
+                        <button type="submit" className="px-4 py-2 font-bold uppercase border-2 border-black rounded bg-white text-black hover:bg-gray-100">Buscar</button>
+                    </form>
+                    <select value={userRol} onChange={(e) => setUserRol(e.target.value)} className="border-2 border-black rounded px-3 py-2 text-black uppercase">
+                        <option value="">Todos los roles</option>
+                        <option value="aprendiz">Aprendiz</option>
+                        <option value="saludable">Saludable</option>
+                        <option value="chef">Chef</option>
+                        <option value="admin">Admin</option>
+                    </select>
+                    <select value={userSort} onChange={(e) => setUserSort(e.target.value)} className="border-2 border-black rounded px-3 py-2 text-black uppercase">
+                        <option value="newest">Más recientes</option>
+                        <option value="recipes">Más recetas</option>
+                        <option value="followers">Más seguidores</option>
+                        <option value="likes">Más likes</option>
+                    </select>
+                    <button onClick={handleExportUsers} className="ml-auto px-4 py-2 font-bold uppercase border-2 border-black rounded shadow-retro-sm bg-primary text-black">
+                        Exportar CSV
+                    </button>
+                </div>
+            )}
+
             {loading ? (
                 <div className="text-center py-20 font-mono animate-pulse">CARGANDO DATOS...</div>
             ) : activeTab === 'users' ? (
@@ -91,6 +150,8 @@ const AdminView: React.FC<AdminViewProps> = ({ onEditRecipe, onUserClick }) => {
                                 <th className="p-4 uppercase">Nombre</th>
                                 <th className="p-4 uppercase">Rol</th>
                                 <th className="p-4 uppercase">Recetas</th>
+                                <th className="p-4 uppercase">Seguidores</th>
+                                <th className="p-4 uppercase">Likes</th>
                                 <th className="p-4 uppercase text-right">Acciones</th>
                             </tr>
                         </thead>
@@ -112,6 +173,8 @@ const AdminView: React.FC<AdminViewProps> = ({ onEditRecipe, onUserClick }) => {
                                         </span>
                                     </td>
                                     <td className="p-4">{u.recipes_count || 0}</td>
+                                    <td className="p-4">{u.followers_count || 0}</td>
+                                    <td className="p-4">{u.likes_received || 0}</td>
                                     <td className="p-4 text-right flex items-center justify-end gap-2">
                                         {u.rol !== 'admin' ? (
                                             <select 
@@ -149,6 +212,14 @@ const AdminView: React.FC<AdminViewProps> = ({ onEditRecipe, onUserClick }) => {
                             ))}
                         </tbody>
                     </table>
+                    {usersCursor && (
+                        <button
+                            onClick={loadMoreUsers}
+                            className="w-full p-4 font-bold uppercase text-sm border-t-2 border-black text-black hover:bg-gray-100"
+                        >
+                            Cargar más
+                        </button>
+                    )}
                 </div>
             ) : (
                 <div className="overflow-x-auto border-2 border-black rounded-lg shadow-retro bg-white">